@@ -1,62 +1,175 @@
-import hashlib
+import os
+import sys
+import time
 import random
-from fastecdsa import keys, curve
+import hashlib
+import argparse
+from itertools import count
+from fastecdsa import curve
+from collision_store import FingerprintSet
+from fixed_base import DEFAULT_G_TABLE_WINDOW, g_table, load_or_build_g_table, mul_G_batch, set_g_table
+from scheduler import run_ordered
+
+# Constants (can be overridden via arguments)
+DEFAULT_OUTPUT_FILE = "PRADOX-WORK.txt"
+DEFAULT_BLOCK_SIZE = 4096  # attempts generated per task
+BLOCKS_PER_ROUND = 8  # blocks per process handed to the pool at a time
+DEFAULT_FLUSH_INTERVAL = 10.0  # seconds between flushes of the record file
+WRITE_BUFFER = 1 << 20
+REPORT_EVERY = 100000  # attempts between progress lines
+FORMATS = ['text', 'binary']
+FP_BYTES = 8  # leading bytes of the re-hash kept in the seen-set
+
+# Binary record file: 16-byte header, then per attempt the hash, private key and
+# public key x and y, 32 bytes each, big-endian
+RECORD_MAGIC = b'PRADOXR1'
+RECORD_HEADER = RECORD_MAGIC + (1).to_bytes(8, 'little')
+RECORD_SIZE = 128
+
+N = curve.secp256k1.q
+
 
-def generate_random_hash(length=64):
+def random_hash(rng):
     """
-    Generate a random hash of a given length.
+    Generate a random hash: sha256 of 64 random hex digits.
     """
-    random_data = ''.join(random.choices('0123456789abcdef', k=length))
+    random_data = format(rng.getrandbits(256), '064x')
     return hashlib.sha256(random_data.encode()).hexdigest()
 
-def save_to_file(filename, data):
+
+def block_rng(seed, block):
+    """
+    Every block draws from its own stream, so any attempt can be regenerated
+    from (seed, attempt number) alone.
+    """
+    return random.Random(f"{seed}:{block}")
+
+
+def regenerate_hash(seed, attempt, block_size):
+    """
+    The random hash of an earlier attempt.
+    """
+    block, offset = divmod(attempt, block_size)
+    rng = block_rng(seed, block)
+    for _ in range(offset):
+        rng.getrandbits(256)
+    return random_hash(rng)
+
+
+def generate_block(task):
+    """
+    Generate one block of attempts: random hash, private key, public key.
+    Returns the formatted records and the re-hash fingerprints, packed.
+    """
+    seed, block, size, fmt = task
+    rng = block_rng(seed, block)
+    hashes = [random_hash(rng) for _ in range(size)]
+    private_keys = [int(h, 16) % N for h in hashes]  # the hash (256-bit) as a private key, fit within curve order
+    public_keys = mul_G_batch(private_keys)
+    if fmt == 'binary':
+        records = b''.join(
+            bytes.fromhex(h) + k.to_bytes(32, 'big') + x.to_bytes(32, 'big') + y.to_bytes(32, 'big')
+            for h, k, (x, y) in zip(hashes, private_keys, public_keys)
+        )
+    else:
+        records = ''.join(
+            f"Hash: {h}, Private Key: {k}, Public Key: ({x}, {y})\n"
+            for h, k, (x, y) in zip(hashes, private_keys, public_keys)
+        ).encode()
+    fingerprints = b''.join(hashlib.sha256(h.encode()).digest()[:FP_BYTES] for h in hashes)
+    return records, fingerprints
+
+
+def save_collision(f, original_hash, colliding_hash):
     """
-    Save key pairs and hashes to a file.
+    Append the collision details in the original text layout.
     """
-    with open(filename, 'a') as file:
-        file.write(data + '\n')
+    private_key = int(colliding_hash, 16) % N
+    (x, y), = mul_G_batch([private_key])
+    f.write((
+        "\nCollision Found!\n"
+        f"Original Hash: {original_hash}\n"
+        f"Colliding Hash: {colliding_hash}\n"
+        f"Private Key: {private_key}\n"
+        f"Public Key: ({x}, {y})\n"
+    ).encode())
+
 
-def find_collision_and_save(filename="PRADOX-WORK.txt"):
+def find_collision_and_save(filename=DEFAULT_OUTPUT_FILE, seed=None, processes=1, block_size=DEFAULT_BLOCK_SIZE,
+                            fmt='text', flush_interval=DEFAULT_FLUSH_INTERVAL, max_attempts=None):
     """
-    Generate random hashes, derive keys, and check for collisions.
+    Generate random hashes, derive keys, and check for collisions of the re-hash.
+    Blocks are generated in worker processes; this process writes every record
+    through one buffered file and keeps the seen-set of re-hash fingerprints.
     """
-    key_map = {}  # Store private keys and their hashes
+    if seed is None:
+        seed = int.from_bytes(os.urandom(8), 'big')
+    seen = FingerprintSet()
     attempts = 0
+    start = last_flush = time.time()
+    print(f"Seed: {seed}", file=sys.stderr)
 
-    while True:
-        # Step 1: Generate a random hash
-        random_hash = generate_random_hash()
-        
-        # Step 2: Use the hash (256-bit) as a private key
-        truncated_hash = int(random_hash[:64], 16)  # Use first 256 bits
-        private_key = truncated_hash % curve.secp256k1.q  # Fit within curve order
-
-        # Step 3: Compute the public key
-        public_key = keys.get_public_key(private_key, curve.secp256k1)
-
-        # Step 4: Save the generated keys and hash
-        keypair_data = f"Hash: {random_hash}, Private Key: {private_key}, Public Key: ({public_key.x}, {public_key.y})"
-        save_to_file(filename, keypair_data)
-
-        # Step 5: Re-hash and check for collision
-        rehashed_value = hashlib.sha256(random_hash.encode()).hexdigest()
-        if rehashed_value in key_map:
-            # Collision found
-            save_to_file(filename, "\nCollision Found!")
-            save_to_file(filename, f"Original Hash: {key_map[rehashed_value]['hash']}")
-            save_to_file(filename, f"Colliding Hash: {random_hash}")
-            save_to_file(filename, f"Private Key: {private_key}")
-            save_to_file(filename, f"Public Key: ({public_key.x}, {public_key.y})")
-            print("Collision detected! Details saved.")
-            break
-        else:
-            # Store the key and hash for later checks
-            key_map[rehashed_value] = {'hash': random_hash, 'private_key': private_key, 'public_key': public_key}
-
-        attempts += 1
-        if attempts % 1000 == 0:
-            print(f"Attempts: {attempts}, Unique Keys: {len(key_map)}")
+    new = not os.path.exists(filename) or os.path.getsize(filename) == 0
+    with open(filename, 'ab', buffering=WRITE_BUFFER) as f:
+        if fmt == 'binary' and new:
+            f.write(RECORD_HEADER)
+        rounds = count(0, BLOCKS_PER_ROUND * processes)
+        for first_block in rounds:
+            tasks = [(seed, block, block_size, fmt) for block in range(first_block, first_block + BLOCKS_PER_ROUND * processes)]
+            for block, (records, fingerprints) in zip(range(first_block, first_block + len(tasks)), run_ordered(generate_block, tasks, processes)):
+                f.write(records)
+                base = block * block_size
+                for i in range(block_size):
+                    fp = int.from_bytes(fingerprints[i * FP_BYTES:(i + 1) * FP_BYTES], 'big')
+                    earlier = seen.add(fp, base + i)
+                    if earlier is None:
+                        continue
+                    # Fingerprint match: confirm on the full re-hash before reporting
+                    original_hash = regenerate_hash(seed, earlier, block_size)
+                    colliding_hash = regenerate_hash(seed, base + i, block_size)
+                    if hashlib.sha256(original_hash.encode()).digest() != hashlib.sha256(colliding_hash.encode()).digest():
+                        continue
+                    if fmt == 'binary':
+                        with open(f"{filename}.collision.txt", 'ab') as out:
+                            save_collision(out, original_hash, colliding_hash)
+                    else:
+                        save_collision(f, original_hash, colliding_hash)
+                    print("Collision detected! Details saved.")
+                    return base + i + 1
+                attempts = base + block_size
+                now = time.time()
+                if now - last_flush >= flush_interval:
+                    f.flush()
+                    last_flush = now
+                if attempts % REPORT_EVERY < block_size:
+                    print(f"Attempts: {attempts}, Unique Keys: {len(seen)}, "
+                          f"{attempts / max(now - start, 1e-9):.0f}/s, seen-set {seen.nbytes / len(seen):.1f} bytes/attempt")
+                if max_attempts is not None and attempts >= max_attempts:
+                    return attempts
 
-# Run the script
-find_collision_and_save()
 
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Random-hash key pairs with a collision check on the re-hash.")
+    parser.add_argument('--output', type=str, default=DEFAULT_OUTPUT_FILE, help='File the key pairs are appended to.')
+    parser.add_argument('--output_format', type=str, default='text', choices=FORMATS, help="'text' lines as before or fixed 128-byte 'binary' records.")
+    parser.add_argument('--processes', type=int, default=1, help='Processes generating blocks.')
+    parser.add_argument('--block_size', type=int, default=DEFAULT_BLOCK_SIZE, help='Attempts per block.')
+    parser.add_argument('--seed', type=int, default=None, help='Seed for reproducible runs (default: random).')
+    parser.add_argument('--flush_interval', type=float, default=DEFAULT_FLUSH_INTERVAL, help='Seconds between flushes of the output file.')
+    parser.add_argument('--max_attempts', type=int, default=None, help='Stop after this many attempts (default: run until a collision).')
+    parser.add_argument('--g_table', type=str, default=None, help='Disk-cached multiples of G, built on first use (default: a small in-memory table).')
+    parser.add_argument('--g_window', type=int, default=DEFAULT_G_TABLE_WINDOW, help='Window bits of the fixed-base table.')
+    return parser.parse_args()
+
+
+# Run the script
+if __name__ == "__main__":
+    args = parse_arguments()
+    # Multiples of G, set up before the workers fork so they share it: the disk-cached table
+    # only when asked for, otherwise the default in-memory one
+    if args.g_table:
+        set_g_table(load_or_build_g_table(args.g_table, args.g_window))
+    else:
+        g_table()
+    find_collision_and_save(args.output, args.seed, args.processes, args.block_size, args.output_format,
+                            args.flush_interval, args.max_attempts)
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import platform
+import argparse
+import subprocess
+import tempfile
+from multiprocessing import Process, Queue, cpu_count
+from fastecdsa.curve import secp256k1
+from bsgs_table import CompactBabyTable, load_or_build_tiered_table
+from ec_batch import BACKENDS, DEFAULT_BACKEND, set_backend, to_affine
+from fixed_base import g_table, mul_G, mul_G_batch
+from hashing import BINARY, LEGACY, hash_x_batch
+from scheduler import plan_chunks, run_chunks
+import bigbirthV2 as bsgs
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+# Constants (can be overridden via arguments)
+DEFAULT_MS = [4096, 65536]
+DEFAULT_BITS_LIST = [16, 24]
+DEFAULT_GIANT_STEPS = 20000  # giant steps per worker in each cell
+DEFAULT_LOOKUPS = 100000
+DEFAULT_SCALAR_MULS = 1000
+DEFAULT_KAT_COUNT = 20
+DEFAULT_KAT_M = 1024
+DEFAULT_PUBKEYS_FILE = '160pub.txt'
+DEFAULT_OUTPUT_FILE = None  # JSON goes to stdout
+
+# Private keys of the first puzzle targets in 160pub.txt; line n lies in [2^(n-1), 2^n)
+KNOWN_PUZZLE_KEYS = [
+    1, 3, 7, 8, 21, 49, 76, 224, 467, 514,
+    1155, 2683, 5216, 10544, 26867, 51510, 95823, 198669, 357535, 863317,
+]
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Benchmarks and known-answer tests for the Baby-Step Giant-Step search.")
+    parser.add_argument('--m', type=int, nargs='+', default=DEFAULT_MS, help='Baby-Step table sizes to benchmark.')
+    parser.add_argument('--bits', type=int, nargs='+', default=DEFAULT_BITS_LIST, help='Hash truncation widths to benchmark.')
+    parser.add_argument('--workers', type=int, nargs='+', default=None, help='Worker counts to benchmark (default: 1 and all cores).')
+    parser.add_argument('--giant_steps', type=int, default=DEFAULT_GIANT_STEPS, help='Giant-Steps per worker in each run.')
+    parser.add_argument('--lookups', type=int, default=DEFAULT_LOOKUPS, help='Table probes per lookup benchmark.')
+    parser.add_argument('--scalar_muls', type=int, default=DEFAULT_SCALAR_MULS, help='k * G multiplications per scalar benchmark.')
+    parser.add_argument('--kat_count', type=int, default=DEFAULT_KAT_COUNT, help='Number of low puzzle keys to solve.')
+    parser.add_argument('--target_keys', type=str, default=DEFAULT_PUBKEYS_FILE, help='Puzzle public keys, one per line.')
+    parser.add_argument('--backend', type=str, default=DEFAULT_BACKEND, choices=BACKENDS, help="Field arithmetic for point batches; 'numpy' is a cross-check, slower than 'python'.")
+    parser.add_argument('--skip_bench', action='store_true', help='Only run the known-answer tests.')
+    parser.add_argument('--skip_kat', action='store_true', help='Only run the benchmarks.')
+    parser.add_argument('--output', type=str, default=DEFAULT_OUTPUT_FILE, help='Write the JSON report here instead of stdout.')
+    return parser.parse_args()
+
+
+# Peak resident set size in bytes of this process and its finished children
+def peak_rss():
+    if resource is None:
+        return None
+    scale = 1 if sys.platform == 'darwin' else 1024  # ru_maxrss is KiB on Linux, bytes on macOS
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return max(own, children) * scale
+
+
+def rate(count, seconds):
+    return count / seconds if seconds > 0 else None
+
+
+# Commit the benchmark ran on, if this is a git checkout
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment(backend):
+    return {
+        'backend': backend,
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpu_count': cpu_count(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+    }
+
+
+# One benchmark cell: table build, lookups, hashing and giant steps for one (m, bits, workers)
+def bench_cell(m, bits, workers, giant_steps, lookups, scalar_muls):
+    rng = random.Random(m * 1000 + bits)
+    result = {'m': m, 'bits': bits, 'workers': workers}
+
+    t0 = time.perf_counter()
+    baby_steps = bsgs.create_baby_step_table(m)
+    t1 = time.perf_counter()
+    compact = CompactBabyTable.build(m)
+    t2 = time.perf_counter()
+    result['baby_steps_per_sec'] = rate(m, t1 - t0)
+    result['compact_baby_steps_per_sec'] = rate(m, t2 - t1)
+
+    # Half the probes hit, as a giant-step walk near the key would
+    xs = list(baby_steps)
+    probes = [rng.choice(xs) if k % 2 else rng.getrandbits(256) for k in range(lookups)]
+    t0 = time.perf_counter()
+    for x in probes:
+        x in baby_steps
+    t1 = time.perf_counter()
+    for x in probes:
+        x in compact
+    t2 = time.perf_counter()
+    result['dict_lookups_per_sec'] = rate(lookups, t1 - t0)
+    result['compact_lookups_per_sec'] = rate(lookups, t2 - t1)
+
+    t0 = time.perf_counter()
+    for x in probes:
+        bsgs.truncated_hash(str(x), bits)
+    t1 = time.perf_counter()
+    hash_x_batch(probes, bits, LEGACY)
+    t2 = time.perf_counter()
+    hash_x_batch(probes, bits, BINARY)
+    t3 = time.perf_counter()
+    result['hashes_per_sec'] = rate(lookups, t1 - t0)
+    result['legacy_batch_hashes_per_sec'] = rate(lookups, t2 - t1)
+    result['binary_batch_hashes_per_sec'] = rate(lookups, t3 - t2)
+
+    # k * G: fastecdsa against the fixed-base table (built before timing), single and batched
+    scalars = [rng.randrange(1, secp256k1.q) for _ in range(scalar_muls)]
+    g_table()
+    t0 = time.perf_counter()
+    for k in scalars:
+        k * secp256k1.G
+    t1 = time.perf_counter()
+    for k in scalars:
+        mul_G(k)
+    t2 = time.perf_counter()
+    mul_G_batch(scalars)
+    t3 = time.perf_counter()
+    result['scalar_muls_per_sec'] = rate(scalar_muls, t1 - t0)
+    result['fixed_base_muls_per_sec'] = rate(scalar_muls, t2 - t1)
+    result['fixed_base_batch_muls_per_sec'] = rate(scalar_muls, t3 - t2)
+
+    # Giant steps against a random target, so nothing is found and every step is paid for
+    Q = rng.randrange(1, secp256k1.q) * secp256k1.G
+    walks = [(Q, 0 * secp256k1.G, 0)]
+    steps = giant_steps * workers
+    tasks = plan_chunks([0], steps, workers)
+    t0 = time.perf_counter()
+    for _ in run_chunks(
+        bsgs.giant_step_chunk, tasks, workers,
+        initializer=bsgs.init_giant_worker, initargs=(walks, m * secp256k1.G, baby_steps, bits, m)
+    ):
+        pass
+    t1 = time.perf_counter()
+    result['giant_steps_per_sec'] = rate(steps, t1 - t0)
+    result['peak_rss_bytes'] = peak_rss()
+    return result
+
+
+def _cell_process(queue, *args):
+    queue.put(bench_cell(*args))
+
+
+# Run each cell in a fresh process so peak RSS belongs to that cell alone
+def run_benchmarks(ms, bits_list, worker_counts, giant_steps, lookups, scalar_muls):
+    results = []
+    for m in ms:
+        for bits in bits_list:
+            for workers in worker_counts:
+                queue = Queue()
+                process = Process(target=_cell_process, args=(queue, m, bits, workers, giant_steps, lookups, scalar_muls))
+                process.start()
+                result = queue.get()
+                process.join()
+                print(f"m={m} bits={bits} workers={workers}: "
+                      f"{result['giant_steps_per_sec']:.0f} giant steps/s", file=sys.stderr)
+                results.append(result)
+    return results
+
+
+# Known-answer tests: solve the low puzzle keys with each table layout and check the exact scalars
+def run_kats(target_keys, count, m=DEFAULT_KAT_M, bits=bsgs.DEFAULT_BITS):
+    targets = bsgs.load_targets(target_keys, puzzle=True)[:count]
+    table_dir = tempfile.mkdtemp()
+    configs = [
+        ('dict', False, bsgs.create_baby_step_table(m)),
+        ('compact', False, CompactBabyTable.build(m)),
+        ('tiered', False, load_or_build_tiered_table(os.path.join(table_dir, 'tiered64.bin'), m, fp_bits=64)),
+        ('tiered-fp32', False, load_or_build_tiered_table(os.path.join(table_dir, 'tiered32.bin'), m, fp_bits=32)),
+        ('dict', True, bsgs.create_baby_step_table(m)),
+    ]
+    cases = []
+    for table, symmetric, baby_steps in configs:
+        stride = 2 * m - 1 if symmetric else m
+        offset = m - 1 if symmetric else 0
+        for n, (pubkey, lo, hi) in enumerate(targets, 1):
+            Q = bsgs.pubkey_to_point(pubkey)
+            base = lo + offset
+            t0 = time.perf_counter()
+            keys = bsgs.giant_step_range(
+                Q, 0, -(-(hi - lo) // stride), base * secp256k1.G, stride * secp256k1.G,
+                baby_steps, bits, [], base, stride, symmetric=symmetric
+            )
+            elapsed = time.perf_counter() - t0
+            # Keys found via the target hash are x coordinates, and the classic table also
+            # reports base + j * stride + i for S = -i * G; keep only scalars that open Q
+            recovered = sorted({k for k in keys if lo <= k < hi and to_affine(k * secp256k1.G) == to_affine(Q)})
+            expected = KNOWN_PUZZLE_KEYS[n - 1] if n <= len(KNOWN_PUZZLE_KEYS) else None
+            cases.append({
+                'puzzle': n,
+                'table': table,
+                'symmetric': symmetric,
+                'expected': expected,
+                'recovered': recovered,
+                'passed': recovered == [expected] if expected is not None else len(recovered) == 1,
+                'seconds': elapsed,
+            })
+    shutil.rmtree(table_dir, ignore_errors=True)
+    return {
+        'm': m,
+        'cases': cases,
+        'passed': sum(case['passed'] for case in cases),
+        'failed': sum(not case['passed'] for case in cases),
+    }
+
+
+# Cross-check a vectorised backend's field and point arithmetic against Python ints
+def check_backend(name):
+    if name == 'python':
+        return {'backend': name, 'passed': True}
+    import ec_numpy
+    t0 = time.perf_counter()
+    try:
+        checked = ec_numpy.self_check()
+    except AssertionError:
+        return {'backend': name, 'passed': False}
+    return {'backend': name, 'passed': True, 'elements': checked, 'seconds': time.perf_counter() - t0}
+
+
+def main():
+    args = parse_arguments()
+    set_backend(args.backend)  # benchmark cells are forked and inherit it
+    report = {'environment': environment(args.backend)}
+    if not args.skip_bench:
+        workers = args.workers or sorted({1, cpu_count()})
+        report['benchmarks'] = run_benchmarks(args.m, args.bits, workers, args.giant_steps, args.lookups, args.scalar_muls)
+    if not args.skip_kat:
+        report['kat'] = run_kats(args.target_keys, args.kat_count)
+        report['kat']['backend_check'] = check_backend(args.backend)
+        if not report['kat']['backend_check']['passed']:
+            report['kat']['failed'] += 1
+        print(f"Known-answer tests: {report['kat']['passed']} passed, {report['kat']['failed']} failed", file=sys.stderr)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+    if report.get('kat', {}).get('failed'):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,16 +4,20 @@ import os
 import hashlib
 import time
 import logging
-from multiprocessing import Pool, cpu_count
+from multiprocessing import cpu_count
 from fastecdsa.curve import secp256k1
 from fastecdsa.point import Point
 from collections import defaultdict
+from bsgs_table import load_or_build_table
+from ec_batch import add, consecutive_multiples, neg, point_x, to_affine
+from scheduler import plan_chunks, run_chunks
 
 # Constants
-BS_FILE = 'baby_steps_table.txt'
+BS_FILE = 'baby_steps_table.bin'
 FOUND_KEYS_FILE = 'found_keys.txt'
 TARGET_KEYS = 'pubkeys.txt'
 DEFAULT_M = 5000
+COMPACT_TABLE = False  # Keep 64-bit x fingerprints instead of full x coordinates
 
 # Logging Configuration
 logging.basicConfig(
@@ -31,10 +35,9 @@ def truncated_hash(input_data, bits=16):
 def create_baby_step_table(m):
     logging.info(f"Creating Baby-Step table with m={m}")
     baby_steps = {}
-    point = secp256k1.G
-    for i in range(m):
-        baby_steps[point.x] = i
-        point += secp256k1.G
+    G = to_affine(secp256k1.G)
+    for i, point in enumerate(consecutive_multiples(G, G, m)):
+        baby_steps[point_x(point)] = i  # point = (i + 1) * G
     return baby_steps
 
 # Load Public Keys with Validation
@@ -58,9 +61,9 @@ def pubkey_to_point(pubkey):
     try:
         x = int(pubkey[2:66], 16)
         if len(pubkey) < 70:  # Compressed format
-            y = pow(x**3 + 7, (secp256k1.q + 1) // 4, secp256k1.q) % secp256k1.q
-            if (pubkey[:2] == '03') != (y % 2 == 0):
-                y = secp256k1.q - y
+            y = pow(x**3 + 7, (secp256k1.p + 1) // 4, secp256k1.p) % secp256k1.p  # field prime, not the order q
+            if (pubkey[:2] == '03') == (y % 2 == 0):  # 02 means even y, 03 odd y
+                y = secp256k1.p - y
         else:
             y = int(pubkey[66:], 16)
         return Point(x, y, curve=secp256k1)
@@ -73,27 +76,30 @@ def pubkey_to_point(pubkey):
 
 # Parallel Giant-Step Lookup
 def giant_step(args):
-    Qlist, k1G, mG, baby_steps = args
+    Qlist, k1G, mG, baby_steps = args[:4]
+    j0, j1 = args[4:] if len(args) > 4 else (0, DEFAULT_M)  # optional giant-step range
     found_keys = []
     key_hash_map = defaultdict(list)  # Map to store hashes and their corresponding keys
     publickey_map = defaultdict(list)  # Map to store similar public keys
     target_hash = truncated_hash("TARGET")  # Replace "TARGET" with the actual target data
 
     for Q in Qlist:
-        S = Q - k1G
-        for j in range(DEFAULT_M):
+        start = add(to_affine(Q - k1G), neg(to_affine(j0 * mG)))
+        walk = consecutive_multiples(start, neg(to_affine(mG)), j1 - j0)
+        for j, S in enumerate(walk, j0):
+            Sx = point_x(S)
             # Check Baby Steps
-            if S.x in baby_steps:
-                private_key = baby_steps[S.x] + j * DEFAULT_M
-                found_keys.append(private_key)
+            if Sx in baby_steps:
+                hits = baby_steps[Sx]
+                for i in (hits if isinstance(hits, list) else [hits]):
+                    private_key = i + j * DEFAULT_M
+                    found_keys.append(private_key)
 
             # Hashing for Birthday Paradox
-            hash_value = truncated_hash(str(S.x))
-            key_hash_map[hash_value].append(S.x)
+            hash_value = truncated_hash(str(Sx))
+            key_hash_map[hash_value].append(Sx)
             if hash_value == target_hash:
-                found_keys.append(S.x)
-
-            S -= mG
+                found_keys.append(Sx)
 
     # Keys sharing similar hashes or public keys
     collisions = []
@@ -103,6 +109,18 @@ def giant_step(args):
 
     return found_keys, collisions, key_hash_map, publickey_map
 
+# Worker state for chunked search, set once per process by the Pool initializer
+_worker = {}
+
+def init_giant_worker(Qlist, k1G, mG, baby_steps):
+    _worker.update(Qlist=Qlist, k1G=k1G, mG=mG, baby_steps=baby_steps)
+
+# One (target index, j0, j1) chunk of the giant-step range
+def giant_step_chunk(task):
+    t, j0, j1 = task
+    args = ([_worker['Qlist'][t]], _worker['k1G'], _worker['mG'], _worker['baby_steps'], j0, j1)
+    return (task,) + giant_step(args)
+
 # Save Found Keys
 def save_keys(keys, filename=FOUND_KEYS_FILE):
     with open(filename, 'a') as f:
@@ -122,25 +140,30 @@ def main():
     Qlist = [pubkey_to_point(pub) for pub in pubkeys]
 
     logging.info("Generating baby-step table...")
-    baby_steps = create_baby_step_table(DEFAULT_M)
+    if COMPACT_TABLE:
+        baby_steps = load_or_build_table(BS_FILE, DEFAULT_M, start=1)  # same (i + 1) * G layout as the dict
+    else:
+        baby_steps = create_baby_step_table(DEFAULT_M)
 
     logging.info("Starting giant-step search...")
     mG = DEFAULT_M * secp256k1.G
     k1G = 0x40000 * secp256k1.G
 
-    # Parallel Processing
-    with Pool(cpu_count()) as pool:
-        results = pool.map(
-            giant_step,
-            [(Qlist[i::cpu_count()], k1G, mG, baby_steps) for i in range(cpu_count())]
-        )
+    # Parallel Processing: every target's j range is split into chunks for all cores
+    tasks = plan_chunks(range(len(Qlist)), DEFAULT_M, cpu_count())
+    results = sorted(run_chunks(
+        giant_step_chunk, tasks, cpu_count(),
+        initializer=init_giant_worker, initargs=(Qlist, k1G, mG, baby_steps)
+    ), key=lambda result: result[0])
 
     # Collect and Save Results
     found_keys = []
-    collisions = []
+    key_hash_map = defaultdict(list)
     for result in results:
-        found_keys.extend(result[0])
-        collisions.extend(result[1])
+        found_keys.extend(result[1])
+        for hash_value, keys in result[3].items():
+            key_hash_map[hash_value].extend(keys)
+    collisions = [(hash_value, keys) for hash_value, keys in key_hash_map.items() if len(keys) > 1]
 
     save_keys(found_keys)
     save_collisions(collisions)
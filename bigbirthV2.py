@@ -5,74 +5,162 @@ import hashlib
 import time
 import logging
 import argparse
-from multiprocessing import Pool, cpu_count
+from itertools import islice
+from multiprocessing import Array, cpu_count
 from fastecdsa.curve import secp256k1
 from fastecdsa.point import Point
-from collections import defaultdict
+from bsgs_table import (
+    DEFAULT_BLOCK_RECORDS, DEFAULT_FILTER_FP_RATE, DEFAULT_FP_BITS, load_or_build_table, load_or_build_tiered_table
+)
+from fixed_base import DEFAULT_G_TABLE_FILE, DEFAULT_G_TABLE_WINDOW, load_or_build_g_table, mul_G, set_g_table
+from ec_batch import BACKENDS, DEFAULT_BACKEND, DEFAULT_BATCH, add, cached_multiples, consecutive_multiples, multi_offsets, neg, point_x, set_backend, to_affine, x_range
+from scheduler import plan_chunks, plan_lockstep_chunks, plan_shards, run_chunks, run_ordered
+from checkpoint import Checkpoint, DEFAULT_CHECKPOINT_INTERVAL, saved_param
+from kangaroo import solve_kangaroo
+from collision_store import CollisionAccumulator, DEFAULT_MEMORY_BUDGET
+from hashing import DEFAULT_HASH_FUNC, HASH_MODES, LEGACY, hash_key_bytes, hash_label, hash_x_batch, target_hash
+from telemetry import DEFAULT_REPORT_INTERVAL, PROGRESS_STEPS, Reporter, SharedCounters
+from results import DEFAULT_VERIFIED_KEYS_FILE, ResultWriter, verify_key
+from output_format import DEFAULT_FORMAT, FORMATS, CollisionWriter, write_keys
+from planner import estimate, format_duration, format_plan, measure_rates, plan_search
+from target_index import CACHE_SUFFIX, load_or_build_target_cache, search_interval
+import profiling
 
 # Constants (can be overridden via arguments)
 DEFAULT_M = 500000
+DEFAULT_RANGE_START = 0x40000  # interval start for targets listed without bounds
 DEFAULT_BITS = 24  # Default hash space size increased to 24 bits
-DEFAULT_BS_FILE = 'baby_steps_table.txt'
+DEFAULT_HASH_MODE = LEGACY  # keep results comparable with earlier runs
+DEFAULT_ALGO = 'bsgs'  # 'bsgs', 'kangaroo' or 'indexed'
+DEFAULT_TABLE = 'dict'  # 'dict' keeps full x coordinates, 'compact' keeps fingerprints, 'tiered' keeps them on disk
+TABLES = ['dict', 'compact', 'tiered']
+DEFAULT_BS_FILE = 'baby_steps_table.bin'
 DEFAULT_FOUND_KEYS_FILE = 'found_keys.txt'
 DEFAULT_COLLISIONS_FILE = 'collisions.txt'
 DEFAULT_TARGET_KEYS_FILE = 'pubkeys.txt'
 DEFAULT_LOG_FILE = 'collision_log.txt'
+DEFAULT_CHECKPOINT_FILE = 'giant_steps.checkpoint'
 
-# Logging Configuration
-logging.basicConfig(
-    filename=DEFAULT_LOG_FILE,
-    level=logging.DEBUG,
-    format="%(asctime)s - %(levelname)s - %(message)s"
-)
+# Logging Configuration (done by the entry points, so importing this module creates no files)
+def configure_logging(filename=DEFAULT_LOG_FILE):
+    logging.basicConfig(
+        filename=filename,
+        level=logging.DEBUG,
+        format="%(asctime)s - %(levelname)s - %(message)s"
+    )
 
 def parse_arguments():
     parser = argparse.ArgumentParser(description="Optimized Baby-Step Giant-Step script for finding private keys.")
     parser.add_argument('--m', type=int, default=DEFAULT_M, help='Number of Baby-Steps.')
     parser.add_argument('--bits', type=int, default=DEFAULT_BITS, help='Number of bits for hash truncation.')
-    parser.add_argument('--bs_file', type=str, default=DEFAULT_BS_FILE, help='Filename for the Baby-Step table.')
+    parser.add_argument('--algo', type=str, default=DEFAULT_ALGO, choices=['bsgs', 'kangaroo', 'indexed'], help="Search algorithm; 'indexed' walks [start, end) once against a cached index of all targets.")
+    parser.add_argument('--hash_mode', type=str, default=DEFAULT_HASH_MODE, choices=list(HASH_MODES), help="Truncated hash input: 'legacy' decimal string (original output) or 'binary' 32-byte x.")
+    parser.add_argument('--hash_func', type=str, default=DEFAULT_HASH_FUNC, help='hashlib algorithm for the truncated hash.')
+    parser.add_argument('--table', type=str, default=DEFAULT_TABLE, choices=TABLES, help='Baby-Step table layout.')
+    parser.add_argument('--backend', type=str, default=DEFAULT_BACKEND, choices=BACKENDS, help="Field arithmetic for point batches: 'python' ints (fastest) or 'numpy' limb arrays (a cross-check, slower).")
+    parser.add_argument('--g_table', type=str, default=None, help=f'Disk-cached fixed-base table of G multiples, e.g. {DEFAULT_G_TABLE_FILE} (default: a small in-memory table).')
+    parser.add_argument('--g_window', type=int, default=DEFAULT_G_TABLE_WINDOW, help='Window bits of the --g_table file.')
+    parser.add_argument('--fp_bits', type=int, default=DEFAULT_FP_BITS, choices=[32, 64], help='Fingerprint width for the compact table.')
+    parser.add_argument('--bs_file', type=str, default=DEFAULT_BS_FILE, help='Filename for the Baby-Step table file (compact and tiered tables).')
+    parser.add_argument('--filter_fp_rate', type=float, default=DEFAULT_FILTER_FP_RATE, help='Target false-positive rate of the in-RAM filter (tiered table).')
+    parser.add_argument('--filter_mb', type=float, default=None, help='Fixed filter size in MiB instead of --filter_fp_rate (tiered table).')
+    parser.add_argument('--block_records', type=int, default=DEFAULT_BLOCK_RECORDS, help='Fingerprints per disk block read on a filter hit (tiered table).')
     parser.add_argument('--found_keys_file', type=str, default=DEFAULT_FOUND_KEYS_FILE, help='Filename for found keys.')
     parser.add_argument('--collisions_file', type=str, default=DEFAULT_COLLISIONS_FILE, help='Filename for collisions.')
+    parser.add_argument('--output_format', type=str, default=DEFAULT_FORMAT, choices=FORMATS, help="Format of the found keys and collisions files: 'text' (original), 'jsonl' or fixed-width 'binary' records.")
     parser.add_argument('--target_keys', type=str, default=DEFAULT_TARGET_KEYS_FILE, help='Filename for target public keys.')
+    parser.add_argument('--target_cache', type=str, default=None, help=f'Decompressed target points for --algo indexed (default: the target file name plus {CACHE_SUFFIX}).')
+    parser.add_argument('--symmetric', action='store_true', help='Resolve table hits to +/- i, doubling the giant stride for the same table.')
+    parser.add_argument('--lockstep', action='store_true', help='Walk all targets together, sharing one inversion per batch, and drop targets once solved.')
+    parser.add_argument('--processes', type=int, default=None, help='Worker processes (default: all cores).')
+    parser.add_argument('--chunk_size', type=int, default=None, help='Giant-Steps per scheduled chunk (default: automatic).')
+    parser.add_argument('--checkpoint_file', type=str, default=DEFAULT_CHECKPOINT_FILE, help='Filename for the progress checkpoint.')
+    parser.add_argument('--checkpoint_interval', type=float, default=DEFAULT_CHECKPOINT_INTERVAL, help='Seconds between checkpoint writes.')
+    parser.add_argument('--resume', action='store_true', help='Skip chunks completed by a previous run with the same parameters.')
+    parser.add_argument('--memory_budget', type=int, default=DEFAULT_MEMORY_BUDGET // (1024 * 1024), help='MiB of hash records kept in RAM before spilling sorted runs to disk.')
+    parser.add_argument('--spill_dir', type=str, default=None, help='Directory for spilled collision runs (default: system temp).')
+    parser.add_argument('--start', type=lambda v: int(v, 16), default=DEFAULT_RANGE_START, help='Interval start (hex) for targets listed without bounds.')
+    parser.add_argument('--end', type=lambda v: int(v, 16), default=None, help='Interval end (hex, exclusive) for targets listed without bounds (default: start + m * 500000).')
+    parser.add_argument('--puzzle', action='store_true', help='Targets listed without bounds are puzzle keys: line n lies in [2^(n-1), 2^n).')
+    parser.add_argument('--ram', type=int, default=None, help='MiB available for the Baby-Step table; picks m and the table layout automatically.')
+    parser.add_argument('--dry_run', action='store_true', help='Print the memory and time estimate and exit.')
+    parser.add_argument('--report_interval', type=float, default=DEFAULT_REPORT_INTERVAL, help='Seconds between progress reports (0 disables telemetry).')
+    parser.add_argument('--status_file', type=str, default=None, help='JSON status file rewritten at every progress report.')
+    parser.add_argument('--prom_file', type=str, default=None, help='Prometheus textfile rewritten at every progress report.')
+    parser.add_argument('--profile', action='store_true', help='Time every pipeline stage in all processes and print a merged report at the end.')
+    parser.add_argument('--profile_memory', action='store_true', help='With --profile: trace allocations and peak memory per stage (tracemalloc, slower).')
+    parser.add_argument('--profile_cprofile', type=int, default=0, help='With --profile: run cProfile on every Nth chunk of each worker and merge the samples (0: off).')
+    parser.add_argument('--profile_file', type=str, default=None, help='With --profile: also save the report as JSON here (cProfile samples go to <file>.pstats).')
+    parser.add_argument('--verified_keys_file', type=str, default=DEFAULT_VERIFIED_KEYS_FILE, help='Filename for verified keys, written and fsynced as they are found.')
     args, unknown = parser.parse_known_args()
     return args
 
-# Hash Function with Configurable Hash Space
+# Hash Function with Configurable Hash Space (string form; the search hashes in batches via hashing.py)
 def truncated_hash(input_data, bits=DEFAULT_BITS):
     full_hash = hashlib.sha256(input_data.encode()).hexdigest()
     return full_hash[:bits // 4]  # Adjust truncation based on bit size
 
 # Create Baby-Step Table
-def create_baby_step_table(m, curve=secp256k1):
+def create_baby_step_table(m, curve=secp256k1, processes=1):
     logging.info(f"Creating Baby-Step table with m={m}")
     baby_steps = {}
-    for i in range(m):
-        point = i * curve.G
-        baby_steps[point.x] = baby_steps.get(point.x, []) + [i]  # Maintain lists for multiple steps
-        if i % (m // 10) == 0 and i > 0:
-            logging.debug(f"Created {i} out of {m} Baby-Steps")
+    # i * G for i = 0..m-1, stepped in batches that share one inversion. Shards are built by
+    # `processes` workers and inserted in index order, so the dict matches a serial build.
+    i = 0
+    for xs in run_ordered(x_range, [(0, a, b) for a, b in plan_shards(m, processes)], processes):
+        for x in xs:
+            baby_steps[x] = baby_steps.get(x, []) + [i]  # Maintain lists for multiple steps
+            if i % (m // 10) == 0 and i > 0:
+                logging.debug(f"Created {i} out of {m} Baby-Steps")
+            i += 1
     logging.info("Baby-Step table created successfully.")
     return baby_steps
 
-# Load Public Keys with Validation
-def load_pubkeys(filename):
-    keys = []
+# Open the Baby-Step table in the requested layout
+def open_baby_steps(table, m, bs_file=DEFAULT_BS_FILE, fp_bits=DEFAULT_FP_BITS, filter_fp_rate=DEFAULT_FILTER_FP_RATE,
+                    filter_mb=None, block_records=DEFAULT_BLOCK_RECORDS, processes=1):
+    if table == 'compact':
+        return load_or_build_table(bs_file, m, 0, fp_bits, processes)  # workers re-map it by path
+    if table == 'tiered':
+        filter_bytes = int(filter_mb * 1024 * 1024) if filter_mb else None
+        return load_or_build_tiered_table(bs_file, m, 0, fp_bits, filter_fp_rate, filter_bytes, block_records, processes)
+    return create_baby_step_table(m, processes=processes)
+
+# Load Targets with Validation: one "pubkey [start end]" per line, bounds in hex.
+# Lines without bounds get [start, end), or with puzzle=True the puzzle interval
+# [2^(n-1), 2^n) for line n.
+def load_targets(filename, start=DEFAULT_RANGE_START, end=None, puzzle=False):
+    targets = []
     try:
         with open(filename, 'r') as f:
             for line_num, line in enumerate(f, 1):
-                key = line.strip()
-                if key and (len(key) in {66, 130}) and key[:2] in {'02', '03', '04'}:
-                    keys.append(key)
+                fields = line.split()
+                key = fields[0] if fields else ''
+                if not (key and (len(key) in {66, 130}) and key[:2] in {'02', '03', '04'}):
+                    logging.warning(f"Invalid key on line {line_num}: {line.strip()}")
+                    continue
+                if len(fields) >= 3:
+                    lo, hi = int(fields[1], 16), int(fields[2], 16)
+                elif puzzle:
+                    lo, hi = 1 << (line_num - 1), 1 << line_num
                 else:
-                    logging.warning(f"Invalid key on line {line_num}: {key}")
+                    lo, hi = start, end
+                if hi is not None and hi <= lo:
+                    logging.warning(f"Empty interval on line {line_num}: [{lo:#x}, {hi:#x})")
+                    continue
+                targets.append((key, lo, hi))
     except FileNotFoundError:
         logging.error(f"File not found: {filename}")
         raise
     except Exception as e:
         logging.error(f"Error reading {filename}: {e}")
         raise
-    logging.info(f"{len(keys)} valid public keys loaded.")
-    return keys
+    logging.info(f"{len(targets)} valid public keys loaded.")
+    return targets
+
+# Load Public Keys with Validation
+def load_pubkeys(filename):
+    return [key for key, _, _ in load_targets(filename)]
 
 # Convert Public Key to Point with Error Handling
 def pubkey_to_point(pubkey):
@@ -82,12 +170,12 @@ def pubkey_to_point(pubkey):
             y = int(pubkey[66:], 16)
         else:  # Compressed format
             x = int(pubkey[2:66], 16)
-            alpha = (x**3 + 7) % secp256k1.q
-            beta = pow(alpha, (secp256k1.q + 1) // 4, secp256k1.q)
+            alpha = (x**3 + 7) % secp256k1.p  # field prime, not the group order q
+            beta = pow(alpha, (secp256k1.p + 1) // 4, secp256k1.p)
             if (pubkey[:2] == '02' and beta % 2 == 0) or (pubkey[:2] == '03' and beta % 2 != 0):
                 y = beta
             else:
-                y = secp256k1.q - beta
+                y = secp256k1.p - beta
         return Point(x, y, curve=secp256k1)
     except ValueError as e:
         logging.error(f"ValueError in pubkey_to_point for key {pubkey}: {e}")
@@ -96,112 +184,455 @@ def pubkey_to_point(pubkey):
         logging.error(f"Unexpected error in pubkey_to_point for key {pubkey}: {e}")
         return None
 
-# Giant-Step Function for Parallel Search
-def giant_step(args):
-    Qlist, k1G, mG, baby_steps, bits = args
-    found_keys = []
-    collisions = []
-    key_hash_map = defaultdict(list)
-    target_hash = truncated_hash("TARGET", bits=bits)
-
-    for Q in Qlist:
-        if Q is None:
-            continue
-        S = Q - k1G
-        for j in range(DEFAULT_M):
-            if S.x in baby_steps:
-                for i in baby_steps[S.x]:
-                    private_key = i + j * DEFAULT_M
-                    found_keys.append(private_key)
-
-            hash_value = truncated_hash(str(S.x), bits=bits)
-            key_hash_map[hash_value].append(S.x)
-            if hash_value == target_hash:
-                found_keys.append(S.x)
-
-            S -= mG
-
-    for hash_value, keys in key_hash_map.items():
-        if len(keys) > 1:
-            collisions.append((hash_value, keys))
-
-    return found_keys, collisions
+# Giant-Step kernel: walk S = Q - k1G - j * mG for j in [j0, j1), where k1G = base * G
+# and mG = stride * G. Every step's (hash, x) is appended to hash_log in j order.
+# A table hit on x means S = i * G, i.e. private key base + j * stride + i. In symmetric
+# mode S = -i * G is resolved too (by comparing y), giving base + j * stride - i.
+# progress(steps, hits) is called every PROGRESS_STEPS steps and once at the end;
+# on_candidate(key) is called for every table hit as soon as it is found.
+def giant_step_range(Q, j0, j1, k1G, mG, baby_steps, bits, hash_log, base, stride,
+                     hash_mode=DEFAULT_HASH_MODE, hash_func=DEFAULT_HASH_FUNC, symmetric=False,
+                     progress=None, on_candidate=None):
+    found = []  # (j, order, key) so keys come out in step order
+    target = target_hash(bits, hash_mode, hash_func)
+    next_report = j0 + PROGRESS_STEPS if progress is not None else None
+    reported = j0
+
+    # Stepped in batches that share one inversion
+    start = add(to_affine(Q - k1G), neg(mul_G(j0 * stride)))
+    walk = consecutive_multiples(start, neg(to_affine(mG)), j1 - j0)
+    xs = []
+    # Taken from the walk one inversion batch at a time, so the profiler times batches, not steps
+    for b0 in range(j0, j1, DEFAULT_BATCH):
+        n = min(DEFAULT_BATCH, j1 - b0)
+        with profiling.stage('giant_step', n):
+            block = list(islice(walk, n))
+        with profiling.stage('table_lookup', n):
+            for j, S in enumerate(block, b0):
+                Sx = point_x(S)
+                hits = baby_steps.get(Sx)  # one probe; compact and tiered tables confirm a hit with mul_G
+                if hits:
+                    for i in hits:
+                        if symmetric and i and mul_G(i) != S:
+                            i = -i  # same x, opposite y: S = -i * G
+                        private_key = base + j * stride + i
+                        found.append((j, 0, private_key))
+                        if on_candidate is not None:
+                            on_candidate(private_key)
+                xs.append(Sx)
+                if j + 1 == next_report:
+                    progress(j + 1 - reported, 0)
+                    reported = next_report
+                    next_report += PROGRESS_STEPS
+
+    # Hash the whole chunk in one batch
+    with profiling.stage('hash', len(xs)):
+        hash_values = hash_x_batch(xs, bits, hash_mode, hash_func)
+    for j, (Sx, hash_value) in enumerate(zip(xs, hash_values), j0):
+        hash_log.append((hash_value, Sx))
+        if hash_value == target:
+            found.append((j, 1, Sx))
+    if progress is not None:
+        progress(j1 - reported, len(found))
+
+    return [key for _, _, key in sorted(found)]
+
+# Lockstep Giant-Step kernel: walk every target in `active` over [j0, min(j1, steps[t])) together.
+# Each round advances all of them batch_size steps with one inversion shared by every target,
+# and probes the table with the whole round. A target leaves the batch when its range ends or
+# one of its hits verifies (solved(t) / on_solved(t) share that across workers).
+# Returns [((t, j0, end), found keys, hash log)] with the same keys and log giant_step_range
+# gives for the steps actually walked.
+def giant_step_lockstep(walks, active, steps, j0, j1, mG, baby_steps, bits, stride,
+                        hash_mode=DEFAULT_HASH_MODE, hash_func=DEFAULT_HASH_FUNC, symmetric=False,
+                        batch_size=DEFAULT_BATCH, progress=None, on_candidate=None, solved=None, on_solved=None):
+    target = target_hash(bits, hash_mode, hash_func)
+    ends = {t: min(j1, steps[t]) for t in active}
+    found = {t: [] for t in active}
+    xs = {t: [] for t in active}
+
+    # One j0 * mG for all targets, then S_t = Q_t - k1G_t - j0 * mG
+    shift = neg(mul_G(j0 * stride))
+    cursors = {}
+    for t in active:
+        if solved is None or not solved(t):
+            Q, k1G, _ = walks[t]
+            cursors[t] = add(to_affine(Q - k1G), shift)
+    with profiling.stage('giant_step'):
+        deltas = cached_multiples(neg(to_affine(mG)), batch_size)  # built once per worker
+
+    j = j0
+    while cursors:
+        ts = list(cursors)
+        counts = [min(batch_size, ends[t] - j) for t in ts]
+        with profiling.stage('giant_step', sum(counts)):
+            blocks = multi_offsets([cursors[t] for t in ts], deltas, counts)
+        with profiling.stage('table_lookup', sum(counts)):
+            for t, n, block in zip(ts, counts, blocks):
+                Q, _, base = walks[t]
+                done = False
+                block_hits = 0
+                for jj, S in enumerate([cursors[t]] + block[:-1], j):
+                    Sx = point_x(S)
+                    hits = baby_steps.get(Sx)
+                    if hits:
+                        block_hits += len(hits)
+                        for i in hits:
+                            if symmetric and i and mul_G(i) != S:
+                                i = -i  # same x, opposite y: S = -i * G
+                            private_key = base + jj * stride + i
+                            found[t].append((jj, 0, private_key))
+                            if on_candidate is not None:
+                                on_candidate(t, private_key)
+                            if verify_key(to_affine(Q), private_key) is not None:
+                                done = True
+                    xs[t].append(Sx)
+                cursors[t] = block[-1]
+                if progress is not None:
+                    progress(t, n, block_hits)
+                if done and on_solved is not None:
+                    on_solved(t)
+                if done or j + n >= ends[t]:
+                    del cursors[t]
+        j += batch_size
+
+    results = []
+    for t in active:
+        with profiling.stage('hash', len(xs[t])):
+            hash_log = list(zip(hash_x_batch(xs[t], bits, hash_mode, hash_func), xs[t]))
+        matches = 0
+        for jj, (hash_value, Sx) in enumerate(hash_log, j0):
+            if hash_value == target:
+                found[t].append((jj, 1, Sx))
+                matches += 1
+        if matches and progress is not None:
+            progress(t, 0, matches)
+        results.append(((t, j0, ends[t]), [key for _, _, key in sorted(found[t])], hash_log))
+    return results
+
+# Giant stride, mG, per-target walks (Q, k1G, base) and giant steps per target for the intervals
+def giant_walks(Qlist, intervals, m, symmetric=False):
+    if symmetric:
+        # Table hits resolve to +/- i, so one table of size m covers 2m - 1 offsets
+        # around each giant step; start m - 1 in so the first window begins at the interval start.
+        stride = 2 * m - 1
+        offset = m - 1
+    else:
+        stride = m
+        offset = 0
+    mG = stride * secp256k1.G
+    walks = [
+        None if Q is None else (Q, (lo + offset) * secp256k1.G, lo + offset)
+        for Q, (lo, hi) in zip(Qlist, intervals)
+    ]
+    steps = {t: -(-(hi - lo) // stride) for t, (Q, (lo, hi)) in enumerate(zip(Qlist, intervals)) if Q is not None}
+    return stride, mG, walks, steps
+
+# Feed one chunk's hash log into the collision store. seq orders steps by target, then j
+# (seq_base[t] is the number of steps of all earlier targets), so buckets come out exactly
+# as a dict filled target by target would list them.
+def accumulate_hashes(accumulator, task, hash_log, seq_base):
+    t, j0, _ = task
+    seq = seq_base[t] + j0
+    for offset, (hash_value, x) in enumerate(hash_log):
+        accumulator.add(hash_value, seq + offset, x)
+
+# Hash buckets with more than one x, labelled like truncated_hash
+def find_collisions(accumulator, bits, hash_mode=DEFAULT_HASH_MODE):
+    return ((hash_label(key, bits, hash_mode), xs) for key, xs in accumulator.collisions())
+
+# Per-worker search state, set once by the Pool initializer instead of pickled per chunk
+_worker = {}
+
+# walks: per target (Q, k1G, base) or None for targets that failed to load
+def init_giant_worker(walks, mG, baby_steps, bits, stride, options=None, counters=None, results=None,
+                      steps=None, solved=None):
+    _worker.update(walks=walks, mG=mG, baby_steps=baby_steps, bits=bits, stride=stride, options=options or {},
+                   counters=counters, results=results, steps=steps, solved=solved)
+    if counters is not None:
+        counters.attach()
+
+# Giant-Step chunk task: (target index, j0, j1) -> [(task, found keys, hash log)]
+def giant_step_chunk(task):
+    t, j0, j1 = task
+    Q, k1G, base = _worker['walks'][t]
+    hash_log = []
+    counters = _worker['counters']
+    results = _worker['results']
+    progress = (lambda steps, hits: counters.advance(t, steps, hits)) if counters is not None else None
+    on_candidate = (lambda key: results.put((t, key))) if results is not None else None
+    found_keys = giant_step_range(
+        Q, j0, j1, k1G, _worker['mG'], _worker['baby_steps'], _worker['bits'], hash_log,
+        base, _worker['stride'], progress=progress, on_candidate=on_candidate, **_worker['options']
+    )
+    return [(task, found_keys, hash_log)]
+
+# Lockstep chunk task: (j0, j1, targets) -> [(per-target task, found keys, hash log)]
+def lockstep_chunk(task):
+    j0, j1, active = task
+    counters = _worker['counters']
+    results = _worker['results']
+    solved = _worker['solved']
+
+    def mark_solved(t):
+        solved[t] = 1
+
+    return giant_step_lockstep(
+        _worker['walks'], active, _worker['steps'], j0, j1, _worker['mG'], _worker['baby_steps'],
+        _worker['bits'], _worker['stride'],
+        progress=counters.advance if counters is not None else None,
+        on_candidate=(lambda t, key: results.put((t, key))) if results is not None else None,
+        solved=solved.__getitem__ if solved is not None else None,
+        on_solved=mark_solved if solved is not None else None,
+        **_worker['options']
+    )
 
 # Save Keys
-def save_keys(keys, filename=DEFAULT_FOUND_KEYS_FILE):
+def save_keys(keys, filename=DEFAULT_FOUND_KEYS_FILE, fmt=DEFAULT_FORMAT):
     if not keys:
         logging.info("No keys found to save.")
         return
     try:
-        with open(filename, 'a') as f:
-            for key in keys:
-                f.write(f"{key}\n")
+        write_keys(keys, filename, fmt)
         logging.info(f"{len(keys)} keys saved to {filename}.")
     except Exception as e:
         logging.error(f"Error saving keys to {filename}: {e}")
 
-# Save Collisions
-def save_collisions(collisions, filename=DEFAULT_COLLISIONS_FILE):
-    if not collisions:
-        logging.info("No collisions found to save.")
-        return
+# Save Collisions (streams any iterable; the file is only created when there is something to write)
+# (hash_bytes is the width of the hash field in binary records)
+def save_collisions(collisions, filename=DEFAULT_COLLISIONS_FILE, fmt=DEFAULT_FORMAT, hash_bytes=0):
+    count = 0
+    writer = CollisionWriter(filename, fmt, hash_bytes)
     try:
-        with open(filename, 'w') as f:
-            for hash_value, keys in collisions:
-                f.write(f"Hash: {hash_value} -> Keys: {keys}\n")
-        logging.info(f"{len(collisions)} collisions saved to {filename}.")
+        for hash_value, keys in collisions:
+            writer.write(hash_value, keys)
+            count += 1
     except Exception as e:
         logging.error(f"Error saving collisions to {filename}: {e}")
+    finally:
+        writer.close()
+    if count:
+        logging.info(f"{count} collisions saved to {filename}.")
+    else:
+        logging.info("No collisions found to save.")
+    return count
 
 # Main Function
 def main(m=DEFAULT_M, bits=DEFAULT_BITS, bs_file=DEFAULT_BS_FILE, 
          found_keys_file=DEFAULT_FOUND_KEYS_FILE, collisions_file=DEFAULT_COLLISIONS_FILE, 
-         target_keys=DEFAULT_TARGET_KEYS_FILE):
+         target_keys=DEFAULT_TARGET_KEYS_FILE, table=DEFAULT_TABLE, fp_bits=DEFAULT_FP_BITS,
+         processes=None, chunk_size=None, algo=DEFAULT_ALGO,
+         checkpoint_file=DEFAULT_CHECKPOINT_FILE, resume=False, checkpoint_interval=DEFAULT_CHECKPOINT_INTERVAL,
+         memory_budget=DEFAULT_MEMORY_BUDGET, spill_dir=None,
+         hash_mode=DEFAULT_HASH_MODE, hash_func=DEFAULT_HASH_FUNC, symmetric=False,
+         range_start=DEFAULT_RANGE_START, range_end=None, puzzle=False, ram=None, dry_run=False,
+         report_interval=DEFAULT_REPORT_INTERVAL, status_file=None, prom_file=None,
+         verified_keys_file=DEFAULT_VERIFIED_KEYS_FILE, lockstep=False,
+         filter_fp_rate=DEFAULT_FILTER_FP_RATE, filter_mb=None, block_records=DEFAULT_BLOCK_RECORDS,
+         backend=DEFAULT_BACKEND, g_table=None, g_window=DEFAULT_G_TABLE_WINDOW, output_format=DEFAULT_FORMAT,
+         target_cache=None, profile=False, profile_memory=False, profile_cprofile=0, profile_file=None):
     
+    configure_logging()
     start_time = time.time()
     logging.info("Starting private key search script.")
+    if profile:
+        profiling.enable(profile_memory, profile_cprofile)  # before any pool is forked
+    set_backend(backend)  # before any pool is forked, so workers inherit it
+
+    if range_end is None:
+        range_end = range_start + m * DEFAULT_M  # the window earlier versions searched
+    num_processes = processes or cpu_count()
+    if g_table:
+        set_g_table(load_or_build_g_table(g_table, g_window, num_processes))
 
-    # Load Public Keys
+    # Indexed mode: the target file is streamed into a cached, deduplicated point file, and
+    # [start, end) is walked once with every k * G probed against the index of all targets
+    if algo == 'indexed':
+        if puzzle:
+            logging.warning("--puzzle is ignored by --algo indexed; every target is searched in [start, end).")
+        with profiling.stage('target_cache'):
+            cache = load_or_build_target_cache(target_keys, target_cache, num_processes, memory_budget, spill_dir)
+        writer = ResultWriter(verified_keys_file, cache.pubkeys, cache.points)
+        writer.start()
+        found_keys = []
+        try:
+            with profiling.stage('indexed_search', range_end - range_start):
+                for t, key in search_interval(cache, range_start, range_end, num_processes):
+                    found_keys.append(key)
+                    writer.submit(t, key)
+        finally:
+            writer.close()
+        with profiling.stage('save_keys', len(found_keys)):
+            save_keys(found_keys, found_keys_file, output_format)
+        logging.info(f"Keys found: {len(found_keys)}")
+        logging.info(f"Process completed in {time.time() - start_time:.2f} seconds.")
+        profiling.finish(profile_file)
+        return
+
+    # Load Public Keys and their key intervals
     logging.info("Loading public keys...")
-    pubkeys = load_pubkeys(target_keys)
-    Qlist = [pubkey_to_point(pub) for pub in pubkeys]
+    with profiling.stage('load_targets'):
+        targets = load_targets(target_keys, range_start, range_end, puzzle)
+        pubkeys = [key for key, _, _ in targets]
+        Qlist = [pubkey_to_point(pub) for pub in pubkeys]
+    intervals = [(lo, hi) for _, lo, hi in targets]
+
+    # Kangaroo mode: same intervals, near-constant memory
+    if algo == 'kangaroo':
+        writer = ResultWriter(verified_keys_file, pubkeys, Qlist)
+        writer.start()
+        found_keys = []
+        for t, (Q, (lo, hi)) in enumerate(zip(Qlist, intervals)):
+            if Q is None:
+                continue
+            with profiling.stage('kangaroo'):
+                key = solve_kangaroo(Q, lo, hi, processes=num_processes)
+            if key is not None:
+                found_keys.append(key)
+                writer.submit(t, key)
+        writer.close()
+        save_keys(found_keys, found_keys_file, output_format)
+        logging.info(f"Keys found: {len(found_keys)}")
+        logging.info(f"Process completed in {time.time() - start_time:.2f} seconds.")
+        profiling.finish(profile_file)
+        return
+
+    # Plan m and the table layout for the RAM budget, or estimate the given settings
+    widths = [hi - lo for Q, (lo, hi) in zip(Qlist, intervals) if Q is not None]
+    rates = measure_rates(hash_mode=hash_mode, hash_func=hash_func) if (ram or dry_run) else None
+    if ram:
+        plan = plan_search(widths, ram * 1024 * 1024, num_processes, symmetric, rates, fp_bits)
+        m, table = plan['m'], plan['table']
+        logging.info(f"Planner chose m={m} with a {table} table for a {ram} MiB budget.")
+    else:
+        table_cached = table != 'dict' and os.path.exists(bs_file)
+        plan = estimate(widths, m, table, num_processes, symmetric, rates, fp_bits, table_cached)
+    logging.info(f"Estimated {plan['giant_steps']} giant steps, ETA {format_duration(plan['total_seconds'])}.")
+    if dry_run:
+        print(format_plan(plan))
+        return
 
     # Create Baby-Step Table
     logging.info("Generating Baby-Step table...")
-    baby_steps = create_baby_step_table(m)
-
-    # Define mG and k1G
-    mG = m * secp256k1.G
-    k1G_scalar = 0x40000  # Configurable scalar value
-    k1G = k1G_scalar * secp256k1.G
-
-    # Prepare Parallel Processing Arguments
-    num_processes = cpu_count()
-    chunk_size = max(1, len(Qlist) // num_processes)
-    args_list = [
-        (Qlist[i * chunk_size: (i + 1) * chunk_size], k1G, mG, baby_steps, bits)
-        for i in range(num_processes)
-    ]
+    with profiling.stage('baby_table', m):
+        baby_steps = open_baby_steps(table, m, bs_file, fp_bits, filter_fp_rate, filter_mb, block_records, num_processes)
 
-    # Start Parallel Processing
-    logging.info(f"Starting parallel processing with {num_processes} processes...")
-    with Pool(processes=num_processes) as pool:
-        results = pool.map(giant_step, args_list)
+    # Define mG (the giant stride) and each target's walk
+    stride, mG, walks, steps = giant_walks(Qlist, intervals, m, symmetric)
+    step_options = dict(hash_mode=hash_mode, hash_func=hash_func, symmetric=symmetric)
+
+    # Split every target's giant-step range into chunks shared by all processes
+    if resume and not chunk_size:
+        # The default follows the process count; keep the chunks of the run being resumed
+        chunk_size = saved_param(checkpoint_file, 'chunk_size')
+    chunk_size = chunk_size or plan['chunk_size']
+    tasks = plan_chunks(sorted(steps), steps, num_processes, chunk_size)
+    if lockstep:
+        # Same chunk boundaries, but every chunk walks all targets together
+        rounds = plan_lockstep_chunks(steps, num_processes, chunk_size)
+    seq_base = {}
+    total_steps = 0
+    for t in sorted(steps):
+        seq_base[t] = total_steps
+        total_steps += steps[t]
 
-    # Collect and Save Results
-    found_keys = []
-    collisions = []
-    for result in results:
-        found_keys.extend(result[0])
-        collisions.extend(result[1])
+    # Checkpoint: everything that must match for completed chunks to be reused
+    params = {
+        'm': m,
+        'stride': stride,
+        'bits': bits,
+        'steps': {str(t): n for t, n in steps.items()},
+        'symmetric': symmetric,
+        'lockstep': lockstep,
+        'chunk_size': chunk_size,
+        'table': table,
+        'hash_mode': hash_mode,
+        'hash_func': hash_func,
+        'table_checksum': getattr(baby_steps, 'checksum', None),
+        'targets': hashlib.sha256('\n'.join(pubkeys).encode()).hexdigest(),
+        'intervals': hashlib.sha256(repr(intervals).encode()).hexdigest(),
+    }
+    checkpoint = Checkpoint.open(checkpoint_file, params, hash_key_bytes(bits, hash_mode), resume=resume,
+                                 interval=checkpoint_interval)
+    pending = checkpoint.pending(tasks)
+    if lockstep:
+        pending_tasks = set(pending)
+        pending = [
+            (j0, j1, tuple(t for t in active if (t, j0, min(j1, steps[t])) in pending_tasks))
+            for j0, j1, active in rounds
+        ]
+        pending = [task for task in pending if task[2]]
+
+    # Found keys are kept per chunk; hashes stream into the disk-backed collision store
+    found_by_task = {}
+    accumulator = CollisionAccumulator(hash_key_bytes(bits, hash_mode), memory_budget, spill_dir)
+    counters = SharedCounters(num_processes, len(walks)) if report_interval > 0 else None
+    # Table hits stream from the workers to a verifier that fsyncs each confirmed key right away
+    writer = ResultWriter(verified_keys_file, pubkeys, Qlist)
+    writer.start()
+    # Lockstep mode drops targets once solved, including those solved by an earlier run
+    solved = None
+    if lockstep:
+        solved_keys = {pubkey for pubkey, _ in writer.seen}
+        solved = Array('b', [pubkey in solved_keys for pubkey in pubkeys] or [0], lock=False)
+    with profiling.stage('checkpoint_replay'):
+        for task, keys, hash_log in checkpoint.replay():
+            found_by_task[task] = keys
+            accumulate_hashes(accumulator, task, hash_log, seq_base)
+            if counters is not None:
+                counters.mark_done(task[0], task[2] - task[1])
+
+    # Live progress: workers bump shared counters, a reporter thread turns them into rates and ETAs
+    reporter = None
+    if counters is not None:
+        reporter = Reporter(counters, steps, report_interval, status_file, prom_file)
+        reporter.start()
+
+    # Start Parallel Processing
+    logging.info(f"Starting parallel processing with {num_processes} processes ({len(pending)} of {len(tasks)} chunks left)...")
+    chunk_func = lockstep_chunk if lockstep else giant_step_chunk
+    prof = profiling.active()
+    if prof is not None:
+        # every chunk result comes back with the worker's stage timings since its last chunk
+        chunk_func, pending = profiling.call_profiled, [(chunk_func, task) for task in pending]
+    try:
+        chunks = run_chunks(
+            chunk_func, pending, num_processes,
+            initializer=init_giant_worker,
+            initargs=(walks, mG, baby_steps, bits, stride, step_options, counters, writer.queue, steps, solved)
+        )
+        if prof is not None:
+            chunks = prof.timed_iter('pool_wait', chunks)
+        for chunk_results in chunks:
+            if prof is not None:
+                chunk_results, snap = chunk_results
+                prof.merge(snap)
+            for task, keys, hash_log in chunk_results:
+                with profiling.stage('checkpoint', len(hash_log)):
+                    checkpoint.record(task, keys, hash_log)
+                found_by_task[task] = keys
+                with profiling.stage('collision_store', len(hash_log)):
+                    accumulate_hashes(accumulator, task, hash_log, seq_base)
+    finally:
+        if reporter is not None:
+            reporter.stop()
+        writer.close()
+    checkpoint.write()
 
-    save_keys(found_keys, found_keys_file)
-    save_collisions(collisions, collisions_file)
+    # Collect and Save Results (in task order, so the output does not depend on scheduling)
+    found_keys = [key for task in sorted(found_by_task) for key in found_by_task[task]]
+    with profiling.stage('save_keys', len(found_keys)):
+        save_keys(found_keys, found_keys_file, output_format)
+    with profiling.stage('save_collisions', len(accumulator)):
+        num_collisions = save_collisions(
+            find_collisions(accumulator, bits, hash_mode), collisions_file, output_format, hash_key_bytes(bits, hash_mode)
+        )
 
     elapsed_time = time.time() - start_time
     logging.info(f"Keys found: {len(found_keys)}")
-    logging.info(f"Collisions found: {len(collisions)}")
+    logging.info(f"Collisions found: {num_collisions}")
     logging.info(f"Process completed in {elapsed_time:.2f} seconds.")
+    profiling.finish(profile_file)
 
 if __name__ == "__main__":
     args = parse_arguments()
@@ -211,5 +642,40 @@ if __name__ == "__main__":
         bs_file=args.bs_file,
         found_keys_file=args.found_keys_file,
         collisions_file=args.collisions_file,
-        target_keys=args.target_keys
+        target_keys=args.target_keys,
+        table=args.table,
+        fp_bits=args.fp_bits,
+        processes=args.processes,
+        chunk_size=args.chunk_size,
+        algo=args.algo,
+        checkpoint_file=args.checkpoint_file,
+        resume=args.resume,
+        checkpoint_interval=args.checkpoint_interval,
+        memory_budget=args.memory_budget * 1024 * 1024,
+        spill_dir=args.spill_dir,
+        hash_mode=args.hash_mode,
+        hash_func=args.hash_func,
+        symmetric=args.symmetric,
+        range_start=args.start,
+        range_end=args.end,
+        puzzle=args.puzzle,
+        ram=args.ram,
+        dry_run=args.dry_run,
+        report_interval=args.report_interval,
+        status_file=args.status_file,
+        prom_file=args.prom_file,
+        verified_keys_file=args.verified_keys_file,
+        lockstep=args.lockstep,
+        filter_fp_rate=args.filter_fp_rate,
+        filter_mb=args.filter_mb,
+        block_records=args.block_records,
+        backend=args.backend,
+        g_table=args.g_table,
+        g_window=args.g_window,
+        output_format=args.output_format,
+        target_cache=args.target_cache,
+        profile=args.profile,
+        profile_memory=args.profile_memory,
+        profile_cprofile=args.profile_cprofile,
+        profile_file=args.profile_file
     )
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+
+import sys
+import json
+import math
+import time
+import argparse
+import numpy as np
+from hashing import DEFAULT_HASH_FUNC, HASH_MODES, LEGACY, hash_width, hash_x_batch
+from scheduler import run_ordered
+
+# Constants (can be overridden via arguments)
+DEFAULT_BITS_LIST = [8, 12, 16, 20, 24]
+DEFAULT_TRIALS = 1000
+DEFAULT_INPUT_MAX = 2**32  # the collison-check scripts draw random.randint(0, 2**32)
+DEFAULT_SEED = 0
+TRIALS_PER_TASK = 64  # trials handed to a worker at once
+FIRST_BATCH = 2.0  # first batch covers this many times the expected attempts
+MAX_BITS = 64  # truncated values are held in uint64 arrays
+INPUT_SPACE_FACTOR = 16  # the input space must be this many times the expected attempts
+EXACT_MAX_WIDTH = 40  # above this the exact sum is replaced by its asymptotic expansion
+PERCENTILES = [1, 10, 25, 50, 75, 90, 99]
+HISTOGRAM_BINS = 20
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Birthday-collision experiments: attempts until the first truncated-hash collision.")
+    parser.add_argument('--bits', type=int, nargs='+', default=DEFAULT_BITS_LIST, help='Hash truncation widths to sweep.')
+    parser.add_argument('--trials', type=int, default=DEFAULT_TRIALS, help='Independent trials per width.')
+    parser.add_argument('--hash_mode', type=str, default=LEGACY, choices=list(HASH_MODES), help="'legacy' hashes the decimal string and keeps whole hex digits (as the collison-check scripts do), 'binary' hashes 32 bytes and keeps any bit width.")
+    parser.add_argument('--hash_func', type=str, default=DEFAULT_HASH_FUNC, help='hashlib algorithm.')
+    parser.add_argument('--input_max', type=int, default=DEFAULT_INPUT_MAX, help='Inputs are drawn uniformly from [0, input_max]; repeated draws are skipped.')
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED, help='Base seed; trial t of a width always uses the same stream.')
+    parser.add_argument('--processes', type=int, default=None, help='Worker processes (default: all cores).')
+    parser.add_argument('--raw', action='store_true', help='Include every trial\'s attempt count in the report.')
+    parser.add_argument('--output', type=str, default=None, help='Write the JSON report here instead of stdout.')
+    return parser.parse_args()
+
+
+# sqrt(pi/2 * N): the usual approximation of the expected draws until the first repeat
+def expected_attempts_approx(width):
+    return math.sqrt(math.pi / 2 * 2**width)
+
+
+# Exact expectation for N equally likely values: sum over k of P(no repeat among k draws).
+# For wide hashes sqrt(pi/2 * N) + 2/3 is within O(1/sqrt(N)) of it.
+def expected_attempts_exact(width, block=1 << 16):
+    if width > EXACT_MAX_WIDTH:
+        return expected_attempts_approx(width) + 2 / 3
+    n = float(2**width)
+    total = 0.0
+    survival = 1.0
+    k = 0
+    while survival > 1e-17:
+        i = np.arange(k, k + block, dtype=np.float64)
+        factors = np.clip(1.0 - i / n, 0.0, None)
+        steps = survival * np.cumprod(factors)
+        total += survival + steps[:-1].sum()  # P(T > k) .. P(T > k + block - 1)
+        survival = steps[-1]
+        k += block
+    return total
+
+
+# Position of the first value that repeats an earlier one, or None
+def first_repeat(values):
+    _, first = np.unique(values, return_index=True)
+    if len(first) == len(values):
+        return None
+    seen_first = np.zeros(len(values), dtype=bool)
+    seen_first[first] = True
+    return int(np.flatnonzero(~seen_first)[0])
+
+
+# Inputs of batch that neither occur earlier in it nor in seen, in draw order
+def new_inputs(seen, batch):
+    combined = np.concatenate([seen, batch])
+    _, first = np.unique(combined, return_index=True)
+    first = np.sort(first[first >= len(seen)])
+    return combined[first]
+
+
+# One trial: draw inputs in batches (growing until a repeat shows up), hash them in bulk,
+# return the number of hashes computed up to and including the colliding one. A drawn
+# input that was already drawn is skipped: it repeats its hash without being a collision.
+def run_trial(rng, bits, hash_mode, hash_func, input_max, first_batch):
+    values = np.empty(0, dtype=np.uint64)
+    seen = np.empty(0, dtype=np.uint64)
+    batch = first_batch
+    while True:
+        inputs = new_inputs(seen, rng.integers(0, input_max, size=batch, endpoint=True, dtype=np.uint64))
+        seen = np.concatenate([seen, inputs])
+        hashed = np.array(hash_x_batch(inputs.tolist(), bits, hash_mode, hash_func), dtype=np.uint64)
+        values = np.concatenate([values, hashed])
+        j = first_repeat(values)
+        if j is not None:
+            return j + 1
+        batch = len(values)  # double the prefix
+
+
+# Worker task: (bits, first trial, trial count, options) -> attempts of each trial
+def trial_block(task):
+    bits, first, count, options = task
+    width = hash_width(bits, options['hash_mode'])
+    first_batch = max(16, int(FIRST_BATCH * expected_attempts_approx(width)))
+    out = []
+    for t in range(first, first + count):
+        rng = np.random.default_rng([options['seed'], bits, t])
+        out.append(run_trial(rng, bits, options['hash_mode'], options['hash_func'], options['input_max'], first_batch))
+    return out
+
+
+def summarize(bits, width, attempts, seconds, raw=False):
+    a = np.asarray(attempts, dtype=np.float64)
+    approx = expected_attempts_approx(width)
+    exact = expected_attempts_exact(width)
+    counts, edges = np.histogram(a, bins=HISTOGRAM_BINS)
+    summary = {
+        'bits': bits,
+        'hash_width': width,
+        'trials': len(a),
+        'mean': a.mean(),
+        'std': a.std(ddof=1) if len(a) > 1 else 0.0,
+        'stderr': a.std(ddof=1) / math.sqrt(len(a)) if len(a) > 1 else 0.0,
+        'min': int(a.min()),
+        'max': int(a.max()),
+        'percentiles': {str(p): v for p, v in zip(PERCENTILES, np.percentile(a, PERCENTILES).tolist())},
+        'expected_approx': approx,
+        'expected_exact': exact,
+        'mean_over_approx': a.mean() / approx,
+        'histogram': {'edges': edges.tolist(), 'counts': counts.tolist()},
+        'seconds': seconds,
+        'trials_per_sec': len(a) / seconds if seconds > 0 else None,
+    }
+    if raw:
+        summary['attempts'] = [int(v) for v in attempts]
+    return summary
+
+
+def run_experiment(bits_list, trials, hash_mode=LEGACY, hash_func=DEFAULT_HASH_FUNC, input_max=DEFAULT_INPUT_MAX,
+                   seed=DEFAULT_SEED, processes=None, raw=False):
+    options = {'hash_mode': hash_mode, 'hash_func': hash_func, 'input_max': input_max, 'seed': seed}
+    results = []
+    for bits in bits_list:
+        width = hash_width(bits, hash_mode)
+        if not 1 <= width <= MAX_BITS:
+            raise ValueError(f"{bits} bits in {hash_mode} mode keeps {width} bits; need 1..{MAX_BITS}")
+        if INPUT_SPACE_FACTOR * expected_attempts_approx(width) > input_max + 1:
+            # distinct inputs would run out, or thin out enough to bias the first repeat
+            raise ValueError(f"A {width}-bit hash needs about {expected_attempts_approx(width):.0f} distinct inputs per trial; "
+                             f"raise --input_max well above {INPUT_SPACE_FACTOR} times that")
+        tasks = [(bits, first, min(TRIALS_PER_TASK, trials - first), options) for first in range(0, trials, TRIALS_PER_TASK)]
+        t0 = time.perf_counter()
+        attempts = [a for block in run_ordered(trial_block, tasks, processes) for a in block]
+        summary = summarize(bits, width, attempts, time.perf_counter() - t0, raw)
+        print(f"bits={bits} ({width}-bit hash): mean {summary['mean']:.1f} +/- {summary['stderr']:.1f} attempts "
+              f"over {trials} trials, sqrt(pi/2 * 2^{width}) = {summary['expected_approx']:.1f}, "
+              f"exact {summary['expected_exact']:.1f} ({summary['seconds']:.1f}s)",
+              file=sys.stderr)
+        results.append(summary)
+    return results
+
+
+def main():
+    args = parse_arguments()
+    report = {
+        'hash_mode': args.hash_mode,
+        'hash_func': args.hash_func,
+        'input_max': args.input_max,
+        'seed': args.seed,
+        'results': run_experiment(args.bits, args.trials, args.hash_mode, args.hash_func, args.input_max,
+                                  args.seed, args.processes, args.raw),
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,439 @@
+#!/usr/bin/env python3
+
+import os
+import math
+import mmap
+import struct
+import hashlib
+import logging
+from array import array
+from bisect import bisect_left
+from fastecdsa.curve import secp256k1
+from ec_batch import point_x, x_range
+from fixed_base import mul_G
+from scheduler import plan_shards, run_ordered
+
+try:
+    import numpy as np
+except ImportError:  # NumPy only speeds up the sort, the table works without it
+    np = None
+
+# Constants
+DEFAULT_FP_BITS = 64
+INDEX_TYPECODE = 'I'  # 32-bit packed baby-step index
+FP_TYPECODES = {32: 'I', 64: 'Q'}
+CURVE_NAME = b'secp256k1'
+
+# Binary table file: fixed header, sorted fingerprints, then matching indices.
+# magic, version, fp_bits, index bits, curve name, m, start, entry count, sha256 of the payload
+TABLE_MAGIC = b'BSGSTBL1'
+TABLE_VERSION = 1
+TABLE_HEADER = struct.Struct('<8sHHI16sQQQ32s')
+TABLE_HEADER_SIZE = 128  # header is padded so the fingerprints start 8-byte aligned
+
+# Tiered table: in-RAM Bloom filter over the fingerprints, on-disk table read block by block
+DEFAULT_FILTER_FP_RATE = 0.01
+DEFAULT_BLOCK_RECORDS = 1024  # fingerprints per disk block (8 KiB with 64-bit fingerprints)
+FILTER_MIX = 0x9E3779B97F4A7C15  # spreads 32-bit fingerprints over 64 bits before double hashing
+SCAN_RECORDS = 1 << 20  # fingerprints read at a time while building the filter
+
+# Tables already mapped by this process, keyed by absolute path
+_mapped_tables = {}
+
+
+# Fixed-width fingerprint of an x coordinate
+def fingerprint(x, fp_bits=DEFAULT_FP_BITS):
+    return x & ((1 << fp_bits) - 1)
+
+
+class CompactBabyTable:
+    """
+    Baby-step table that keeps only a fixed-width fingerprint of every x
+    coordinate plus its packed index, sorted by fingerprint.
+
+    Entry i stands for the point (start + i) * G, so start=0 matches the
+    bigbirthV2.py table and start=1 matches the bigbirth-final.py table.
+    It behaves like a read-only mapping x -> [i, ...]: fingerprint hits are
+    confirmed by recomputing the full point before an index is returned.
+    """
+
+    def __init__(self, fingerprints, indices, m, start=0, fp_bits=DEFAULT_FP_BITS, curve=secp256k1):
+        if fp_bits not in FP_TYPECODES:
+            raise ValueError(f"Unsupported fingerprint width: {fp_bits} (use one of {sorted(FP_TYPECODES)})")
+        if len(fingerprints) != len(indices):
+            raise ValueError("Fingerprint and index buffers differ in length")
+        self.fingerprints = fingerprints
+        self.indices = indices
+        self.m = m
+        self.start = start
+        self.fp_bits = fp_bits
+        self.curve = curve
+        self.path = None  # set when the buffers are a mapped table file
+        self.checksum = None
+        self._mask = (1 << fp_bits) - 1
+
+    # File-backed tables travel to worker processes as their path and are re-mapped there
+    def __reduce__(self):
+        if self.path is not None:
+            return (load_table, (self.path,))
+        return (self.__class__, (self.fingerprints, self.indices, self.m, self.start, self.fp_bits))
+
+    # Shards of the index range are stepped by `processes` workers and concatenated in order,
+    # so the table is byte-identical to a serial build
+    @classmethod
+    def build(cls, m, start=0, fp_bits=DEFAULT_FP_BITS, curve=secp256k1, processes=1):
+        logging.info(f"Creating compact Baby-Step table with m={m}, fp_bits={fp_bits}")
+        if m >= 1 << 32:
+            raise ValueError(f"m={m} does not fit the 32-bit packed index")
+        fps = array(FP_TYPECODES[fp_bits])
+        shards = plan_shards(m, processes)
+        tasks = [(start, a, b, fp_bits) for a, b in shards]
+        for n, shard in enumerate(run_ordered(fingerprint_shard, tasks, processes), 1):
+            fps.extend(shard)
+            if n % max(1, len(tasks) // 10) == 0:
+                logging.debug(f"Created {len(fps)} out of {m} Baby-Steps")
+        fingerprints, indices = sort_entries(fps, fp_bits)
+        logging.info("Compact Baby-Step table created successfully.")
+        return cls(fingerprints, indices, m, start=start, fp_bits=fp_bits, curve=curve)
+
+    def __len__(self):
+        return len(self.indices)
+
+    @property
+    def nbytes(self):
+        return len(self.fingerprints) * self.fingerprints.itemsize + len(self.indices) * self.indices.itemsize
+
+    # Indices whose fingerprint matches x (may contain false positives)
+    def candidates(self, x):
+        fp = x & self._mask
+        fps = self.fingerprints
+        pos = bisect_left(fps, fp)
+        found = []
+        while pos < len(fps) and fps[pos] == fp:  # equal fingerprints are adjacent
+            found.append(self.indices[pos])
+            pos += 1
+        return found
+
+    # Indices whose point really has this x coordinate
+    def lookup(self, x):
+        return [i for i in self.candidates(x) if point_x(mul_G(self.start + i)) == x]
+
+    def __contains__(self, x):
+        return bool(self.lookup(x))
+
+    def __getitem__(self, x):
+        found = self.lookup(x)
+        if not found:
+            raise KeyError(x)
+        return found
+
+    def get(self, x, default=None):
+        found = self.lookup(x)
+        return found if found else default
+
+
+# Fingerprints of one (start, a, b, fp_bits) shard, as a packed array
+def fingerprint_shard(task):
+    start, a, b, fp_bits = task
+    mask = (1 << fp_bits) - 1
+    return array(FP_TYPECODES[fp_bits], (x & mask for x in x_range((start, a, b))))
+
+
+# Sort fingerprints and return (sorted fingerprints, matching indices)
+def sort_entries(fps, fp_bits=DEFAULT_FP_BITS):
+    if np is not None:
+        fp_arr = np.frombuffer(fps, dtype=np.uint64 if fp_bits == 64 else np.uint32)
+        order = np.argsort(fp_arr, kind='stable')
+        fingerprints = array(FP_TYPECODES[fp_bits], fp_arr[order].tobytes())
+        indices = array(INDEX_TYPECODE, order.astype(np.uint32).tobytes())
+    else:
+        order = sorted(range(len(fps)), key=fps.__getitem__)
+        fingerprints = array(FP_TYPECODES[fp_bits], (fps[i] for i in order))
+        indices = array(INDEX_TYPECODE, order)
+    return fingerprints, indices
+
+
+# Checksum over the payload exactly as it is laid out on disk
+def payload_checksum(table):
+    digest = hashlib.sha256()
+    digest.update(memoryview(table.fingerprints).cast('B'))
+    digest.update(memoryview(table.indices).cast('B'))
+    return digest.digest()
+
+
+# Write the table as a binary file (atomic rename, so readers never see half a table)
+def save_table(table, path):
+    checksum = payload_checksum(table)
+    header = TABLE_HEADER.pack(
+        TABLE_MAGIC, TABLE_VERSION, table.fp_bits, 8 * array(INDEX_TYPECODE).itemsize,
+        CURVE_NAME, table.m, table.start, len(table), checksum
+    )
+    tmp_path = f"{path}.{os.getpid()}.tmp"  # processes building the same file do not clash
+    with open(tmp_path, 'wb') as f:
+        f.write(header.ljust(TABLE_HEADER_SIZE, b'\0'))
+        f.write(memoryview(table.fingerprints).cast('B'))
+        f.write(memoryview(table.indices).cast('B'))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    _mapped_tables.pop(os.path.abspath(path), None)
+    table.checksum = checksum.hex()
+    logging.info(f"Baby-Step table with {len(table)} entries saved to {path}.")
+
+
+# Read only the header of a table file
+def read_table_header(path):
+    with open(path, 'rb') as f:
+        raw = f.read(TABLE_HEADER.size)
+    if len(raw) < TABLE_HEADER.size:
+        raise ValueError(f"{path} is too short to be a Baby-Step table")
+    magic, version, fp_bits, index_bits, curve_name, m, start, count, checksum = TABLE_HEADER.unpack(raw)
+    if magic != TABLE_MAGIC or version != TABLE_VERSION:
+        raise ValueError(f"{path} is not a version {TABLE_VERSION} Baby-Step table")
+    return {
+        'fp_bits': fp_bits,
+        'index_bits': index_bits,
+        'curve': curve_name.rstrip(b'\0').decode(),
+        'm': m,
+        'start': start,
+        'count': count,
+        'checksum': checksum.hex(),
+    }
+
+
+# Memory-map a table file; the buffers are views into the shared page cache
+def load_table(path, verify=False):
+    path = os.path.abspath(path)
+    table = _mapped_tables.get(path)
+    if table is not None and not verify:
+        return table
+
+    header = read_table_header(path)
+    if header['curve'] != CURVE_NAME.decode():
+        raise ValueError(f"{path} was built for curve {header['curve']}")
+    if header['index_bits'] != 8 * array(INDEX_TYPECODE).itemsize:
+        raise ValueError(f"{path} uses {header['index_bits']}-bit indices")
+    fp_code = FP_TYPECODES.get(header['fp_bits'])
+    if fp_code is None:
+        raise ValueError(f"{path} uses unsupported fingerprint width {header['fp_bits']}")
+
+    count = header['count']
+    fp_size = count * array(fp_code).itemsize
+    idx_size = count * array(INDEX_TYPECODE).itemsize
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size != TABLE_HEADER_SIZE + fp_size + idx_size:
+            raise ValueError(f"{path} is truncated or has trailing data")
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(mm)
+    fingerprints = view[TABLE_HEADER_SIZE:TABLE_HEADER_SIZE + fp_size].cast(fp_code)
+    indices = view[TABLE_HEADER_SIZE + fp_size:].cast(INDEX_TYPECODE)
+
+    table = CompactBabyTable(fingerprints, indices, header['m'], start=header['start'], fp_bits=header['fp_bits'])
+    table.path = path
+    table.checksum = header['checksum']
+    if verify and payload_checksum(table).hex() != header['checksum']:
+        raise ValueError(f"Checksum mismatch in {path}")
+    _mapped_tables[path] = table
+    logging.info(f"Baby-Step table {path} mapped ({count} entries).")
+    return table
+
+
+# Build and save the table file unless one with the requested layout already exists
+def ensure_table_file(path, m, start=0, fp_bits=DEFAULT_FP_BITS, processes=1):
+    if os.path.exists(path):
+        try:
+            header = read_table_header(path)
+        except ValueError as e:
+            logging.warning(f"Ignoring unreadable table file: {e}")
+        else:
+            if (header['m'], header['start'], header['fp_bits']) == (m, start, fp_bits):
+                return
+            logging.info(f"Table file {path} was built for different parameters, rebuilding.")
+    save_table(CompactBabyTable.build(m, start=start, fp_bits=fp_bits, processes=processes), path)
+
+
+# Map the table file if it matches the requested layout, otherwise build and save it
+def load_or_build_table(path, m, start=0, fp_bits=DEFAULT_FP_BITS, processes=1):
+    ensure_table_file(path, m, start, fp_bits, processes)
+    return load_table(path)
+
+
+# Bloom filter geometry for n entries: (bits, hash count) for a false-positive rate or a fixed size
+def filter_geometry(n, fp_rate=DEFAULT_FILTER_FP_RATE, filter_bytes=None):
+    n = max(1, n)
+    if filter_bytes is None:
+        nbits = math.ceil(-n * math.log(fp_rate) / math.log(2) ** 2)
+    else:
+        nbits = 8 * filter_bytes
+    nbits = max(64, nbits)
+    return nbits, max(1, round(nbits / n * math.log(2)))
+
+
+# Expected false-positive rate of a Bloom filter
+def filter_fp_rate(n, nbits, k):
+    return (1 - math.exp(-k * max(1, n) / nbits)) ** k
+
+
+class TieredBabyTable:
+    """
+    Baby-step table for m beyond RAM: a Bloom filter over the fingerprints
+    and a sparse block index (first fingerprint of every block) stay in
+    memory, the sorted table file stays on disk. A lookup that the filter
+    rejects never touches the disk; a probable hit reads one block of
+    fingerprints with pread, then the matching indices, and is confirmed
+    by recomputing the point like CompactBabyTable.
+    """
+
+    def __init__(self, path, fp_rate=DEFAULT_FILTER_FP_RATE, filter_bytes=None, block_records=DEFAULT_BLOCK_RECORDS,
+                 curve=secp256k1):
+        header = read_table_header(path)
+        fp_code = FP_TYPECODES.get(header['fp_bits'])
+        if fp_code is None:
+            raise ValueError(f"{path} uses unsupported fingerprint width {header['fp_bits']}")
+        self.path = os.path.abspath(path)
+        self.m = header['m']
+        self.start = header['start']
+        self.fp_bits = header['fp_bits']
+        self.checksum = header['checksum']
+        self.count = header['count']
+        self.curve = curve
+        self.block_records = block_records
+        self._fp_code = fp_code
+        self._fp_size = array(fp_code).itemsize
+        self._idx_size = array(INDEX_TYPECODE).itemsize
+        self._idx_offset = TABLE_HEADER_SIZE + self.count * self._fp_size
+        self._mask = (1 << self.fp_bits) - 1
+        self.nbits, self.k = filter_geometry(self.count, fp_rate, filter_bytes)
+        self.probes = 0
+        self.disk_reads = 0
+        self._fd = os.open(self.path, os.O_RDONLY)
+        self.bits, self.block_index = self._scan()
+        logging.info(
+            f"Tiered Baby-Step table {path}: {self.count} entries, filter {self.nbits // 8} bytes, k={self.k}, "
+            f"expected false-positive rate {filter_fp_rate(self.count, self.nbits, self.k):.4%}"
+        )
+
+    # Workers re-open the file; the filter and block index travel with the pickle
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_fd']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._fd = os.open(self.path, os.O_RDONLY)
+
+    def close(self):
+        os.close(self._fd)
+
+    def _positions(self, fp):
+        h = (fp * FILTER_MIX) & 0xFFFFFFFFFFFFFFFF
+        h1 = h & 0xFFFFFFFF
+        h2 = (h >> 32) | 1
+        nbits = self.nbits
+        return [(h1 + i * h2) % nbits for i in range(self.k)]
+
+    # One pass over the fingerprints on disk: set filter bits, keep every block's first fingerprint
+    def _scan(self):
+        bits = bytearray((self.nbits + 7) // 8)
+        block_index = array(self._fp_code)
+        for first in range(0, self.count, SCAN_RECORDS):
+            n = min(SCAN_RECORDS, self.count - first)
+            fps = array(self._fp_code, self._read(TABLE_HEADER_SIZE + first * self._fp_size, n * self._fp_size))
+            block_index.extend(fps[(-first) % self.block_records::self.block_records])
+            if np is not None:
+                self._add_numpy(bits, fps)
+            else:
+                for fp in fps:
+                    for pos in self._positions(fp):
+                        bits[pos >> 3] |= 1 << (pos & 7)
+        return bits, block_index
+
+    def _add_numpy(self, bits, fps):
+        h = np.frombuffer(fps, dtype=np.uint64 if self.fp_bits == 64 else np.uint32).astype(np.uint64)
+        h = h * np.uint64(FILTER_MIX)  # wraps mod 2^64 like the pure-Python path
+        h1 = h & np.uint64(0xFFFFFFFF)
+        h2 = (h >> np.uint64(32)) | np.uint64(1)
+        view = np.frombuffer(bits, dtype=np.uint8)
+        for i in range(self.k):
+            # (h1 + i * h2) stays below 2^64 for k < 2^32
+            pos = (h1 + np.uint64(i) * h2) % np.uint64(self.nbits)
+            np.bitwise_or.at(view, (pos >> np.uint64(3)).astype(np.int64), (np.uint64(1) << (pos & np.uint64(7))).astype(np.uint8))
+
+    def _read(self, offset, size):
+        data = os.pread(self._fd, size, offset)
+        if len(data) != size:
+            raise ValueError(f"{self.path} is truncated")
+        return data
+
+    def __len__(self):
+        return self.count
+
+    # RAM held by the filter and the block index
+    @property
+    def nbytes(self):
+        return len(self.bits) + len(self.block_index) * self.block_index.itemsize
+
+    # Bloom filter test, stopping at the first clear bit (the common case)
+    def might_contain(self, x):
+        h = ((x & self._mask) * FILTER_MIX) & 0xFFFFFFFFFFFFFFFF
+        pos = h & 0xFFFFFFFF
+        step = (h >> 32) | 1
+        nbits = self.nbits
+        bits = self.bits
+        for _ in range(self.k):
+            p = pos % nbits
+            if not bits[p >> 3] >> (p & 7) & 1:
+                return False
+            pos += step
+        return True
+
+    # Indices whose fingerprint matches x (may contain false positives)
+    def candidates(self, x):
+        self.probes += 1
+        if not self.might_contain(x):
+            return []
+        self.disk_reads += 1
+        fp = x & self._mask
+        # Equal fingerprints may straddle a block boundary, so start at the block before
+        block = max(0, bisect_left(self.block_index, fp) - 1)
+        found = []
+        while block < len(self.block_index):
+            first = block * self.block_records
+            n = min(self.block_records, self.count - first)
+            fps = array(self._fp_code, self._read(TABLE_HEADER_SIZE + first * self._fp_size, n * self._fp_size))
+            pos = bisect_left(fps, fp)
+            end = pos
+            while end < n and fps[end] == fp:
+                end += 1
+            if end > pos:
+                found.extend(array(INDEX_TYPECODE, self._read(
+                    self._idx_offset + (first + pos) * self._idx_size, (end - pos) * self._idx_size)))
+            if end < n:
+                break
+            block += 1
+        return found
+
+    # Indices whose point really has this x coordinate
+    def lookup(self, x):
+        return [i for i in self.candidates(x) if point_x(mul_G(self.start + i)) == x]
+
+    def __contains__(self, x):
+        return bool(self.lookup(x))
+
+    def __getitem__(self, x):
+        found = self.lookup(x)
+        if not found:
+            raise KeyError(x)
+        return found
+
+    def get(self, x, default=None):
+        found = self.lookup(x)
+        return found if found else default
+
+
+# Build the table file if needed and open it behind an in-RAM filter
+def load_or_build_tiered_table(path, m, start=0, fp_bits=DEFAULT_FP_BITS, fp_rate=DEFAULT_FILTER_FP_RATE,
+                               filter_bytes=None, block_records=DEFAULT_BLOCK_RECORDS, processes=1):
+    ensure_table_file(path, m, start, fp_bits, processes)
+    return TieredBabyTable(path, fp_rate, filter_bytes, block_records)
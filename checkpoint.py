@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+
+import os
+import json
+import time
+import struct
+import logging
+
+# Constants
+CHECKPOINT_VERSION = 3
+DEFAULT_CHECKPOINT_INTERVAL = 60  # seconds between checkpoint writes
+VALUE_BYTES = 32  # x coordinates, big-endian
+KEY_BYTES = 33  # found keys, big-endian and signed (unreduced keys can fall below zero)
+
+# Results log record: target, j0, j1, number of found keys, number of hash entries,
+# then the keys and the (hash, x) entries, hash_bytes + VALUE_BYTES each
+RECORD_HEADER = struct.Struct('<QQQII')
+
+
+class Checkpoint:
+    """
+    Crash-safe progress record for a chunked giant-step run.
+
+    The checkpoint file is a small JSON document (run parameters, completed
+    j ranges per target, size of the results log) replaced atomically on
+    every write. Results of completed chunks go to an append-only binary log
+    next to it; on resume the log is cut back to the size the last
+    checkpoint recorded, so chunks finished after it are simply redone.
+    """
+
+    def __init__(self, path, params, hash_bytes, interval=DEFAULT_CHECKPOINT_INTERVAL):
+        self.path = path
+        self.log_path = f"{path}.results"
+        self.params = params
+        self.hash_bytes = hash_bytes
+        self.interval = interval
+        self.completed = {}  # target -> merged list of [j0, j1]
+        self.log_size = 0
+        self._buffer = []
+        self._last_write = time.time()
+
+    # Start a fresh checkpoint, or continue the one on disk when resuming
+    @classmethod
+    def open(cls, path, params, hash_bytes, resume=False, interval=DEFAULT_CHECKPOINT_INTERVAL):
+        checkpoint = cls(path, params, hash_bytes, interval)
+        if resume and os.path.exists(path):
+            with open(path, 'r') as f:
+                state = json.load(f)
+            if state.get('version') != CHECKPOINT_VERSION:
+                raise ValueError(f"{path} is not a version {CHECKPOINT_VERSION} checkpoint")
+            if state['params'] != params:
+                changed = sorted(k for k in set(params) | set(state['params']) if params.get(k) != state['params'].get(k))
+                raise ValueError(f"Checkpoint {path} was written with different parameters: {', '.join(changed)}")
+            checkpoint.completed = {int(t): ranges for t, ranges in state['completed'].items()}
+            checkpoint.log_size = state['log_size']
+            logging.info(f"Resuming from {path}: {checkpoint.done_steps()} giant steps already done.")
+        elif resume:
+            logging.warning(f"No checkpoint at {path}, starting from the beginning.")
+        # Drop results written after the last checkpoint (or all of them on a fresh start)
+        with open(checkpoint.log_path, 'ab') as f:
+            f.truncate(checkpoint.log_size)
+        return checkpoint
+
+    def done_steps(self):
+        return sum(b - a for ranges in self.completed.values() for a, b in ranges)
+
+    def is_done(self, task):
+        t, j0, j1 = task
+        return any(a <= j0 and j1 <= b for a, b in self.completed.get(t, ()))
+
+    # Tasks still to run
+    def pending(self, tasks):
+        return [task for task in tasks if not self.is_done(task)]
+
+    # Stream the results of chunks completed in earlier runs as (task, found keys, hash log)
+    def replay(self):
+        hb = self.hash_bytes
+        entry = hb + VALUE_BYTES
+        with open(self.log_path, 'rb') as f:
+            while True:
+                header = f.read(RECORD_HEADER.size)
+                if not header:
+                    return
+                t, j0, j1, num_keys, num_hashes = RECORD_HEADER.unpack(header)
+                raw = f.read(num_keys * KEY_BYTES)
+                keys = [int.from_bytes(raw[i:i + KEY_BYTES], 'big', signed=True) for i in range(0, len(raw), KEY_BYTES)]
+                raw = f.read(num_hashes * entry)
+                hash_log = [
+                    (int.from_bytes(raw[i:i + hb], 'big'), int.from_bytes(raw[i + hb:i + entry], 'big'))
+                    for i in range(0, len(raw), entry)
+                ]
+                yield (t, j0, j1), keys, hash_log
+
+    # Record a finished chunk; it becomes durable at the next write
+    def record(self, task, found_keys, hash_log):
+        t, j0, j1 = task
+        hb = self.hash_bytes
+        self._buffer.append(RECORD_HEADER.pack(t, j0, j1, len(found_keys), len(hash_log)))
+        self._buffer.extend(key.to_bytes(KEY_BYTES, 'big', signed=True) for key in found_keys)
+        self._buffer.extend(h.to_bytes(hb, 'big') + x.to_bytes(VALUE_BYTES, 'big') for h, x in hash_log)
+        self.completed[t] = merge_ranges(self.completed.get(t, []) + [[j0, j1]])
+        if time.time() - self._last_write >= self.interval:
+            self.write()
+
+    # Append buffered results, fsync, then atomically replace the checkpoint file
+    def write(self):
+        if self._buffer:
+            with open(self.log_path, 'ab') as f:
+                f.write(b''.join(self._buffer))
+                f.flush()
+                os.fsync(f.fileno())
+                self.log_size = f.tell()
+            self._buffer = []
+        state = {
+            'version': CHECKPOINT_VERSION,
+            'params': self.params,
+            'completed': {str(t): ranges for t, ranges in sorted(self.completed.items())},
+            'log_size': self.log_size,
+        }
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self._last_write = time.time()
+        logging.debug(f"Checkpoint written: {self.done_steps()} giant steps done.")
+
+
+# A parameter of the checkpoint at path, None if there is none. Used to keep derived
+# settings (the default chunk size follows the process count) stable across resumes.
+def saved_param(path, name):
+    try:
+        with open(path, 'r') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return state.get('params', {}).get(name)
+
+
+# Merge overlapping or touching [j0, j1) ranges
+def merge_ranges(ranges):
+    merged = []
+    for a, b in sorted(ranges):
+        if merged and a <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], b)
+        else:
+            merged.append([a, b])
+    return merged
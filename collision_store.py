@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+
+import os
+import heapq
+import logging
+import tempfile
+from array import array
+
+# Constants
+DEFAULT_MEMORY_BUDGET = 256 * 1024 * 1024  # bytes of buffered records before a run is spilled
+BYTES_OBJECT_OVERHEAD = 41  # CPython bytes header + list slot
+READ_RECORDS = 4096  # records read per run per refill during the merge
+X_BYTES = 32
+SEQ_BYTES = 8
+
+
+class ExternalSorter:
+    """
+    Sorts fixed-width byte records within a memory budget: records are
+    buffered, sorted and spilled to disk as runs, then streamed back
+    through a k-way merge.
+    """
+
+    def __init__(self, record_size, memory_budget=DEFAULT_MEMORY_BUDGET, spill_dir=None):
+        self.record_size = record_size
+        self.max_buffered = max(1, memory_budget // (record_size + BYTES_OBJECT_OVERHEAD))
+        self.spill_dir = spill_dir
+        self.buffer = []
+        self.runs = []
+        self.count = 0
+
+    def add(self, record):
+        self.buffer.append(record)
+        self.count += 1
+        if len(self.buffer) >= self.max_buffered:
+            self._spill()
+
+    def _spill(self):
+        self.buffer.sort()
+        fd, path = tempfile.mkstemp(prefix='collisions-run-', suffix='.bin', dir=self.spill_dir)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(b''.join(self.buffer))
+        self.runs.append(path)
+        logging.debug(f"Spilled sorted run of {len(self.buffer)} records to {path}")
+        self.buffer = []
+
+    def _read_run(self, path):
+        size = self.record_size
+        with open(path, 'rb') as f:
+            while True:
+                block = f.read(size * READ_RECORDS)
+                if not block:
+                    break
+                for offset in range(0, len(block), size):
+                    yield block[offset:offset + size]
+
+    # All records in sorted order; spilled runs are deleted once consumed
+    def sorted_records(self):
+        self.buffer.sort()
+        try:
+            yield from heapq.merge(self.buffer, *(self._read_run(path) for path in self.runs))
+        finally:
+            for path in self.runs:
+                os.remove(path)
+            self.runs = []
+            self.buffer = []
+
+
+class CollisionAccumulator:
+    """
+    Streaming replacement for the in-RAM key_hash_map: add (hash, seq, x)
+    for every giant step, then iterate the buckets that received more than
+    one x. Buckets come out in order of their first seq and members in seq
+    order, which is exactly the order a dict of lists would give when seq
+    follows insertion order.
+    """
+
+    def __init__(self, key_bytes, memory_budget=DEFAULT_MEMORY_BUDGET, spill_dir=None):
+        self.key_bytes = key_bytes
+        self.memory_budget = memory_budget
+        self.spill_dir = spill_dir
+        self.entries = ExternalSorter(key_bytes + SEQ_BYTES + X_BYTES, memory_budget, spill_dir)
+
+    def add(self, key, seq, x):
+        self.entries.add(
+            key.to_bytes(self.key_bytes, 'big') + seq.to_bytes(SEQ_BYTES, 'big') + x.to_bytes(X_BYTES, 'big')
+        )
+
+    def __len__(self):
+        return self.entries.count
+
+    # Pass 1: group by key (sorted by key, seq) and re-emit members of groups with
+    # more than one x, prefixed by the group's first seq.
+    # Pass 2: sort those by (first seq, seq) to restore first-seen bucket order.
+    def collisions(self):
+        kb = self.key_bytes
+        groups = ExternalSorter(SEQ_BYTES + kb + SEQ_BYTES + X_BYTES, self.memory_budget, self.spill_dir)
+        group = []
+        for record in self.entries.sorted_records():
+            if group and record[:kb] != group[0][:kb]:
+                self._emit_group(group, groups)
+                group = []
+            group.append(record)
+        self._emit_group(group, groups)
+
+        current_key = None
+        members = []
+        for record in groups.sorted_records():
+            key = record[SEQ_BYTES:SEQ_BYTES + kb]
+            if key != current_key:
+                if members:
+                    yield int.from_bytes(current_key, 'big'), members
+                current_key = key
+                members = []
+            members.append(int.from_bytes(record[-X_BYTES:], 'big'))
+        if members:
+            yield int.from_bytes(current_key, 'big'), members
+
+    def _emit_group(self, group, groups):
+        if len(group) < 2:
+            return
+        first_seq = group[0][self.key_bytes:self.key_bytes + SEQ_BYTES]
+        for record in group:
+            groups.add(first_seq + record)
+
+
+class FingerprintSet:
+    """
+    Open-addressing hash set of 64-bit fingerprints, each with the 64-bit
+    index of the item it came from, in two flat arrays. That is 16 bytes per
+    slot, under 2 / MAX_LOAD times that per entry, where a dict or set of
+    Python objects spends well over 100. Fingerprints are assumed to be
+    uniformly distributed (digest bytes), so the low bits pick the slot.
+    """
+
+    MAX_LOAD = 0.7
+    EMPTY = 0  # a fingerprint of 0 is stored as 1
+
+    def __init__(self, capacity=1 << 16):
+        size = 1
+        while size * self.MAX_LOAD < capacity:
+            size <<= 1
+        self._allocate(size)
+        self.count = 0
+
+    def _allocate(self, size):
+        self.mask = size - 1
+        self.fps = array('Q', bytes(8 * size))
+        self.indices = array('Q', bytes(8 * size))
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def nbytes(self):
+        return (len(self.fps) + len(self.indices)) * 8
+
+    # Index stored under fp, or None
+    def get(self, fp):
+        fp = fp or 1
+        fps, mask = self.fps, self.mask
+        slot = fp & mask
+        while True:
+            stored = fps[slot]
+            if stored == self.EMPTY:
+                return None
+            if stored == fp:
+                return self.indices[slot]
+            slot = (slot + 1) & mask
+
+    # Insert fp -> index; returns the index already stored under fp, or None
+    def add(self, fp, index):
+        fp = fp or 1
+        fps, mask = self.fps, self.mask
+        slot = fp & mask
+        while True:
+            stored = fps[slot]
+            if stored == self.EMPTY:
+                break
+            if stored == fp:
+                return self.indices[slot]
+            slot = (slot + 1) & mask
+        fps[slot] = fp
+        self.indices[slot] = index
+        self.count += 1
+        if self.count > self.MAX_LOAD * (mask + 1):
+            self._grow()
+        return None
+
+    def _grow(self):
+        old_fps, old_indices = self.fps, self.indices
+        self._allocate(2 * len(old_fps))
+        fps, indices, mask = self.fps, self.indices, self.mask
+        for fp, index in zip(old_fps, old_indices):
+            if fp != self.EMPTY:
+                slot = fp & mask
+                while fps[slot] != self.EMPTY:
+                    slot = (slot + 1) & mask
+                fps[slot] = fp
+                indices[slot] = index
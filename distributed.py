@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+
+import os
+import time
+import queue
+import hashlib
+import logging
+import secrets
+import argparse
+import threading
+from collections import deque
+from multiprocessing import Process, cpu_count
+from multiprocessing.connection import Client, Listener
+from bsgs_table import DEFAULT_BLOCK_RECORDS, DEFAULT_FILTER_FP_RATE, DEFAULT_FP_BITS
+from ec_batch import BACKENDS, DEFAULT_BACKEND, set_backend
+from fixed_base import DEFAULT_G_TABLE_WINDOW, load_or_build_g_table, set_g_table
+from scheduler import plan_chunks
+from checkpoint import Checkpoint, DEFAULT_CHECKPOINT_INTERVAL
+from collision_store import CollisionAccumulator, DEFAULT_MEMORY_BUDGET
+from hashing import DEFAULT_HASH_FUNC, HASH_MODES, hash_key_bytes
+from results import DEFAULT_VERIFIED_KEYS_FILE, ResultWriter
+from output_format import DEFAULT_FORMAT, FORMATS
+import bigbirthV2 as bsgs
+
+# Constants (can be overridden via arguments)
+DEFAULT_ADDRESS = '127.0.0.1:7777'
+DEFAULT_LEASE_TIMEOUT = 60  # seconds without a heartbeat before a lease is handed to another worker
+DEFAULT_HEARTBEAT = 10  # seconds between worker heartbeats
+DEFAULT_WAIT = 2  # seconds a worker sleeps when every task is leased but not finished
+DEFAULT_CHUNKS_PER_TARGET = 64  # chunks of the longest target's range when --chunk_size is not given
+AUTHKEY_ENV = 'BSGS_AUTHKEY'
+
+# Messages are dicts with an 'op' key, pickled over multiprocessing.connection (HMAC-authenticated):
+#   worker -> coordinator: hello, lease, heartbeat, candidate, result
+#   coordinator -> worker: config (reply to hello), task / wait / done (replies to lease)
+
+
+def parse_address(address):
+    host, port = address.rsplit(':', 1)
+    return host, int(port)
+
+
+class Coordinator:
+    """
+    Owns the target list, the (t, j0, j1) plan and the progress ledger, and
+    leases chunks to TCP workers. Leases are renewed by heartbeats; a lease
+    whose worker disconnects or stays silent for lease_timeout seconds goes
+    back to the front of the queue. Finished chunks feed the same checkpoint,
+    collision store and verifier the single-host run uses.
+    """
+
+    def __init__(self, config, tasks, checkpoint, writer, address=DEFAULT_ADDRESS, authkey=None,
+                 lease_timeout=DEFAULT_LEASE_TIMEOUT):
+        self.config = config
+        self.checkpoint = checkpoint
+        self.writer = writer
+        self.address = parse_address(address)
+        self.authkey = authkey
+        self.lease_timeout = lease_timeout
+        self.total = len(tasks)
+        self.pending = deque(checkpoint.pending(tasks))
+        self.done = set(task for task in tasks if checkpoint.is_done(task))
+        self.leases = {}  # task -> (connection id, deadline)
+        self.finished = queue.Queue()  # (task, keys, hash_log) handed to the main thread
+        self.lock = threading.Lock()
+        self.stopping = threading.Event()
+        self.listener = None
+
+    def serve(self):
+        self.listener = Listener(self.address, authkey=self.authkey)
+        logging.info(f"Coordinator listening on {self.address[0]}:{self.address[1]} ({len(self.pending)} of {self.total} chunks left)")
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self):
+        conn_id = 0
+        while not self.stopping.is_set():
+            try:
+                conn = self.listener.accept()
+            except Exception as e:  # bad authkey, or listener closed on shutdown
+                if not self.stopping.is_set():
+                    logging.warning(f"Rejected connection: {e}")
+                continue
+            conn_id += 1
+            threading.Thread(target=self._handle, args=(conn, conn_id), daemon=True).start()
+
+    def _handle(self, conn, conn_id):
+        name = f"connection {conn_id}"
+        try:
+            while True:
+                message = conn.recv()
+                op = message['op']
+                if op == 'hello':
+                    name = f"{message.get('worker', name)} ({conn_id})"
+                    logging.info(f"Worker {name} connected")
+                    conn.send({'op': 'config', **self.config})
+                elif op == 'lease':
+                    conn.send(self._lease(conn_id))
+                elif op == 'heartbeat':
+                    self._renew(conn_id)
+                elif op == 'candidate':
+                    self.writer.submit(message['target'], message['key'])
+                elif op == 'result':
+                    self._complete(tuple(message['task']), message['keys'], message['hashes'])
+        except (EOFError, OSError):
+            pass
+        finally:
+            conn.close()
+            released = self._release(conn_id)
+            logging.info(f"Worker {name} disconnected, {released} leases returned to the queue")
+
+    def _lease(self, conn_id):
+        with self.lock:
+            if self.pending:
+                task = self.pending.popleft()
+                self.leases[task] = (conn_id, time.time() + self.lease_timeout)
+                return {'op': 'task', 'task': task}
+            if self.leases:
+                return {'op': 'wait', 'seconds': DEFAULT_WAIT}
+            return {'op': 'done'}
+
+    def _renew(self, conn_id):
+        deadline = time.time() + self.lease_timeout
+        with self.lock:
+            for task, (owner, _) in self.leases.items():
+                if owner == conn_id:
+                    self.leases[task] = (owner, deadline)
+
+    def _complete(self, task, keys, hash_log):
+        with self.lock:
+            if task in self.done:
+                return  # finished twice after a reassignment; keep the first
+            self.done.add(task)
+            self.leases.pop(task, None)
+            if task in self.pending:
+                self.pending.remove(task)
+        self.finished.put((task, keys, hash_log))
+
+    # Put a connection's leases (or expired ones) back at the front of the queue
+    def _release(self, conn_id=None):
+        now = time.time()
+        with self.lock:
+            lost = [
+                task for task, (owner, deadline) in self.leases.items()
+                if owner == conn_id or (conn_id is None and deadline < now)
+            ]
+            for task in lost:
+                del self.leases[task]
+                self.pending.appendleft(task)
+        return len(lost)
+
+    # Main thread: record finished chunks until the whole plan is done
+    def results(self):
+        while len(self.done) < self.total or not self.finished.empty():
+            try:
+                yield self.finished.get(timeout=1)
+            except queue.Empty:
+                expired = self._release()
+                if expired:
+                    logging.warning(f"{expired} leases expired and were returned to the queue")
+
+    def close(self):
+        self.stopping.set()
+        if self.listener is not None:
+            self.listener.close()
+
+
+# Coordinator entry point: plan like bigbirthV2.main, but lease the chunks to remote workers
+def run_coordinator(args):
+    start_time = time.time()
+    targets = bsgs.load_targets(args.target_keys, args.start, args.end or args.start + args.m * bsgs.DEFAULT_M, args.puzzle)
+    pubkeys = [key for key, _, _ in targets]
+    intervals = [(lo, hi) for _, lo, hi in targets]
+    Qlist = [bsgs.pubkey_to_point(pub) for pub in pubkeys]
+    _, _, _, steps = bsgs.giant_walks(Qlist, intervals, args.m, args.symmetric)
+    chunk_size = args.chunk_size or max(1, -(-max(steps.values(), default=1) // DEFAULT_CHUNKS_PER_TARGET))
+    tasks = plan_chunks(sorted(steps), steps, chunk_size=chunk_size)
+    seq_base = {}
+    total_steps = 0
+    for t in sorted(steps):
+        seq_base[t] = total_steps
+        total_steps += steps[t]
+
+    config = {
+        'pubkeys': pubkeys,
+        'intervals': intervals,
+        'm': args.m,
+        'bits': args.bits,
+        'symmetric': args.symmetric,
+        'table': args.table,
+        'fp_bits': args.fp_bits,
+        'filter_fp_rate': args.filter_fp_rate,
+        'filter_mb': args.filter_mb,
+        'block_records': args.block_records,
+        'hash_mode': args.hash_mode,
+        'hash_func': args.hash_func,
+        'heartbeat': args.heartbeat,
+    }
+    params = {
+        'm': args.m,
+        'bits': args.bits,
+        'steps': {str(t): n for t, n in steps.items()},
+        'symmetric': args.symmetric,
+        'chunk_size': chunk_size,
+        'table': args.table,
+        'hash_mode': args.hash_mode,
+        'hash_func': args.hash_func,
+        'targets': hashlib.sha256('\n'.join(pubkeys).encode()).hexdigest(),
+        'intervals': hashlib.sha256(repr(intervals).encode()).hexdigest(),
+    }
+    checkpoint = Checkpoint.open(args.checkpoint_file, params, hash_key_bytes(args.bits, args.hash_mode),
+                                 resume=args.resume, interval=args.checkpoint_interval)
+    accumulator = CollisionAccumulator(hash_key_bytes(args.bits, args.hash_mode), args.memory_budget * 1024 * 1024, args.spill_dir)
+    found_by_task = {}
+    for task, keys, hash_log in checkpoint.replay():
+        found_by_task[task] = keys
+        bsgs.accumulate_hashes(accumulator, task, hash_log, seq_base)
+
+    writer = ResultWriter(args.verified_keys_file, pubkeys, Qlist)
+    writer.start()
+    coordinator = Coordinator(config, tasks, checkpoint, writer, args.address, authkey(args), args.lease_timeout)
+    coordinator.serve()
+    try:
+        for done, (task, keys, hash_log) in enumerate(coordinator.results(), 1):
+            checkpoint.record(task, keys, hash_log)
+            found_by_task[task] = keys
+            bsgs.accumulate_hashes(accumulator, task, hash_log, seq_base)
+            if done % max(1, len(tasks) // 10) == 0:
+                logging.info(f"{len(coordinator.done)} out of {len(tasks)} chunks done")
+    finally:
+        coordinator.close()
+        writer.close()
+        checkpoint.write()
+
+    found_keys = [key for task in sorted(found_by_task) for key in found_by_task[task]]
+    bsgs.save_keys(found_keys, args.found_keys_file, args.output_format)
+    num_collisions = bsgs.save_collisions(
+        bsgs.find_collisions(accumulator, args.bits, args.hash_mode), args.collisions_file,
+        args.output_format, hash_key_bytes(args.bits, args.hash_mode)
+    )
+    logging.info(f"Keys found: {len(found_keys)}")
+    logging.info(f"Collisions found: {num_collisions}")
+    logging.info(f"Process completed in {time.time() - start_time:.2f} seconds.")
+
+
+# Ask the coordinator for the search config
+def fetch_config(address, key, name):
+    conn = Client(parse_address(address), authkey=key)
+    try:
+        conn.send({'op': 'hello', 'worker': name})
+        return conn.recv()
+    finally:
+        conn.close()
+
+
+# Worker process: fetch the search config, then lease and walk chunks with the table
+# the parent opened before forking. A heartbeat thread keeps the lease alive for the
+# whole chunk, including the end-of-chunk hash pass, and one more heartbeat goes out
+# right before the result so its transfer starts with a fresh lease.
+def worker_loop(address, key, name, baby_steps):
+    conn = Client(parse_address(address), authkey=key)
+    conn.send({'op': 'hello', 'worker': name})
+    config = conn.recv()
+    Qlist = [bsgs.pubkey_to_point(pub) for pub in config['pubkeys']]
+    stride, mG, walks, _ = bsgs.giant_walks(Qlist, config['intervals'], config['m'], config['symmetric'])
+    options = dict(hash_mode=config['hash_mode'], hash_func=config['hash_func'], symmetric=config['symmetric'])
+    send_lock = threading.Lock()  # the heartbeat thread shares the connection
+    leased = threading.Event()
+    stop = threading.Event()
+
+    def send(message):
+        with send_lock:
+            conn.send(message)
+
+    def heartbeats():
+        try:
+            while not stop.wait(config['heartbeat']):
+                if leased.is_set():
+                    send({'op': 'heartbeat'})
+        except (EOFError, OSError):
+            pass
+
+    beater = threading.Thread(target=heartbeats, daemon=True)
+    beater.start()
+    try:
+        while True:
+            send({'op': 'lease'})
+            reply = conn.recv()
+            if reply['op'] == 'done':
+                break
+            if reply['op'] == 'wait':
+                time.sleep(reply['seconds'])
+                continue
+            t, j0, j1 = reply['task']
+            leased.set()
+            Q, k1G, base = walks[t]
+            hash_log = []
+            keys = bsgs.giant_step_range(
+                Q, j0, j1, k1G, mG, baby_steps, config['bits'], hash_log, base, stride,
+                on_candidate=lambda k: send({'op': 'candidate', 'target': t, 'key': k}),
+                **options
+            )
+            send({'op': 'heartbeat'})
+            send({'op': 'result', 'task': (t, j0, j1), 'keys': keys, 'hashes': hash_log})
+            leased.clear()
+    except (EOFError, OSError):
+        logging.warning(f"Worker {name} lost the coordinator")
+    finally:
+        stop.set()
+        with send_lock:
+            conn.close()
+        beater.join()
+
+
+def run_workers(args):
+    key = authkey(args)
+    processes = args.processes or cpu_count()
+    set_backend(args.backend)
+    if args.g_table:
+        set_g_table(load_or_build_g_table(args.g_table, args.g_window, processes))  # workers fork with it mapped
+    host = os.uname().nodename if hasattr(os, 'uname') else 'worker'
+    # One table per host, built with all cores before forking: the workers inherit it
+    # (compact and tiered tables are memory-mapped and shared, the dict copy-on-write)
+    config = fetch_config(args.address, key, f"{host}/{os.getpid()}")
+    baby_steps = bsgs.open_baby_steps(
+        config['table'], config['m'], args.bs_file, config['fp_bits'],
+        config['filter_fp_rate'], config['filter_mb'], config['block_records'], processes
+    )
+    workers = [
+        Process(target=worker_loop, args=(args.address, key, f"{host}/{os.getpid()}-{w}", baby_steps))
+        for w in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+
+# Shared secret for the HMAC handshake: --authkey, else $BSGS_AUTHKEY, else a fresh one (coordinator only)
+def authkey(args):
+    key = args.authkey or os.environ.get(AUTHKEY_ENV)
+    if key is None:
+        if args.role != 'coordinator':
+            raise SystemExit(f"Workers need --authkey or ${AUTHKEY_ENV} set to the coordinator's key")
+        key = secrets.token_hex(16)
+        print(f"Worker authkey: {key}", flush=True)
+    return key.encode()
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Multi-host Baby-Step Giant-Step: one coordinator, TCP workers.")
+    parser.add_argument('role', choices=['coordinator', 'worker'], help='Run the coordinator or a set of workers.')
+    parser.add_argument('--address', type=str, default=DEFAULT_ADDRESS, help='host:port the coordinator listens on / workers connect to.')
+    parser.add_argument('--authkey', type=str, default=None, help=f'Shared secret (default: ${AUTHKEY_ENV}; the coordinator generates one if unset).')
+    parser.add_argument('--processes', type=int, default=None, help='Worker processes on this host (workers only).')
+    parser.add_argument('--bs_file', type=str, default=bsgs.DEFAULT_BS_FILE, help='Local compact table file (workers only).')
+    parser.add_argument('--backend', type=str, default=DEFAULT_BACKEND, choices=BACKENDS, help="Field arithmetic for point batches (workers only); 'numpy' is a cross-check, slower than 'python'.")
+    parser.add_argument('--g_table', type=str, default=None, help='Disk-cached fixed-base table of G multiples (workers only).')
+    parser.add_argument('--g_window', type=int, default=DEFAULT_G_TABLE_WINDOW, help='Window bits of the --g_table file.')
+    parser.add_argument('--m', type=int, default=bsgs.DEFAULT_M, help='Number of Baby-Steps.')
+    parser.add_argument('--bits', type=int, default=bsgs.DEFAULT_BITS, help='Number of bits for hash truncation.')
+    parser.add_argument('--hash_mode', type=str, default=bsgs.DEFAULT_HASH_MODE, choices=list(HASH_MODES), help='Truncated hash input.')
+    parser.add_argument('--hash_func', type=str, default=DEFAULT_HASH_FUNC, help='hashlib algorithm for the truncated hash.')
+    parser.add_argument('--table', type=str, default=bsgs.DEFAULT_TABLE, choices=bsgs.TABLES, help='Baby-Step table layout.')
+    parser.add_argument('--fp_bits', type=int, default=DEFAULT_FP_BITS, choices=[32, 64], help='Fingerprint width for the compact table.')
+    parser.add_argument('--filter_fp_rate', type=float, default=DEFAULT_FILTER_FP_RATE, help='False-positive rate of the in-RAM filter (tiered table).')
+    parser.add_argument('--filter_mb', type=float, default=None, help='Fixed filter size in MiB (tiered table).')
+    parser.add_argument('--block_records', type=int, default=DEFAULT_BLOCK_RECORDS, help='Fingerprints per disk block (tiered table).')
+    parser.add_argument('--symmetric', action='store_true', help='Resolve table hits to +/- i.')
+    parser.add_argument('--target_keys', type=str, default=bsgs.DEFAULT_TARGET_KEYS_FILE, help='Filename for target public keys.')
+    parser.add_argument('--start', type=lambda v: int(v, 16), default=bsgs.DEFAULT_RANGE_START, help='Interval start (hex) for targets listed without bounds.')
+    parser.add_argument('--end', type=lambda v: int(v, 16), default=None, help='Interval end (hex, exclusive) for targets listed without bounds.')
+    parser.add_argument('--puzzle', action='store_true', help='Line n of the target file lies in [2^(n-1), 2^n).')
+    parser.add_argument('--chunk_size', type=int, default=None, help='Giant-Steps per leased chunk.')
+    parser.add_argument('--lease_timeout', type=float, default=DEFAULT_LEASE_TIMEOUT, help='Seconds without a heartbeat before a lease is reassigned.')
+    parser.add_argument('--heartbeat', type=float, default=DEFAULT_HEARTBEAT, help='Seconds between worker heartbeats.')
+    parser.add_argument('--found_keys_file', type=str, default=bsgs.DEFAULT_FOUND_KEYS_FILE, help='Filename for found keys.')
+    parser.add_argument('--verified_keys_file', type=str, default=DEFAULT_VERIFIED_KEYS_FILE, help='Filename for verified keys.')
+    parser.add_argument('--collisions_file', type=str, default=bsgs.DEFAULT_COLLISIONS_FILE, help='Filename for collisions.')
+    parser.add_argument('--output_format', type=str, default=DEFAULT_FORMAT, choices=FORMATS, help='Format of the found keys and collisions files.')
+    parser.add_argument('--checkpoint_file', type=str, default=bsgs.DEFAULT_CHECKPOINT_FILE, help='Filename for the progress ledger.')
+    parser.add_argument('--checkpoint_interval', type=float, default=DEFAULT_CHECKPOINT_INTERVAL, help='Seconds between ledger writes.')
+    parser.add_argument('--resume', action='store_true', help='Continue the ledger of an earlier coordinator run.')
+    parser.add_argument('--memory_budget', type=int, default=DEFAULT_MEMORY_BUDGET // (1024 * 1024), help='MiB of hash records kept in RAM.')
+    parser.add_argument('--spill_dir', type=str, default=None, help='Directory for spilled collision runs.')
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    bsgs.configure_logging()
+    if args.role == 'coordinator':
+        run_coordinator(args)
+    else:
+        run_workers(args)
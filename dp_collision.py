@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+
+import sys
+import math
+import time
+import queue
+import random
+import logging
+import argparse
+from multiprocessing import Event, Process, Queue, cpu_count
+from hashing import DEFAULT_HASH_FUNC, HASH_MODES, LEGACY, hash_label, hash_width, hash_x_func
+from output_format import DEFAULT_FORMAT, FORMATS, CollisionWriter
+
+# Constants (can be overridden via arguments)
+DEFAULT_BITS = 48
+DEFAULT_COLLISIONS = 1
+DEFAULT_COLLISIONS_FILE = 'dp_collisions.txt'
+DP_MARGIN = 8  # default dp_bits = width / 2 - DP_MARGIN: about 2^DP_MARGIN points stored per expected collision
+MAX_CHAIN_FACTOR = 20  # chains without a distinguished point after this many times 2^dp_bits are dropped (cycles)
+MAX_STEPS_FACTOR = 16  # give up after this many times the expected steps per collision
+CHAINS_PER_REPORT = 64  # finished chains a worker sends at once
+
+
+# Distinguished points have dp_bits zero low bits
+def default_dp_bits(width, processes=1):
+    return max(0, width // 2 - DP_MARGIN - int(math.log2(max(1, processes))))
+
+
+# Worker: start chains x -> f(x) at random points and report (distinguished point, start, length)
+def dp_worker(worker_id, bits, hash_mode, hash_func, dp_bits, seed, results, stop):
+    f = hash_x_func(bits, hash_mode, hash_func)
+    width = hash_width(bits, hash_mode)
+    rng = random.Random(seed * 1000003 + worker_id)
+    dp_mask = (1 << dp_bits) - 1
+    max_chain = MAX_CHAIN_FACTOR << dp_bits
+    chains = []
+    steps = 0
+    while not stop.is_set():
+        start = rng.getrandbits(width)
+        x = f(start)
+        length = 1
+        while x & dp_mask and length < max_chain:
+            x = f(x)
+            length += 1
+        steps += length
+        if not x & dp_mask:
+            chains.append((x, start, length))
+        if len(chains) >= CHAINS_PER_REPORT:
+            results.put((worker_id, steps, chains))
+            chains = []
+            steps = 0
+    results.cancel_join_thread()  # the parent stops reading once it has enough collisions
+
+
+# Two chains ending in the same distinguished point: walk them to the step where they merge.
+# Returns (a, b) with a != b and f(a) == f(b), or None if one chain started on the other.
+def backtrack(f, chain1, chain2):
+    (a, length1), (b, length2) = chain1, chain2
+    while length1 > length2:
+        a = f(a)
+        length1 -= 1
+    while length2 > length1:
+        b = f(b)
+        length2 -= 1
+    if a == b:
+        return None
+    while True:
+        fa, fb = f(a), f(b)
+        if fa == fb:
+            return a, b
+        a, b = fa, fb
+
+
+# van Oorschot-Wiener search: parallel chains, only distinguished points kept.
+# Returns ([(hash value, a, b), ...], stats).
+def find_collisions_dp(bits, collisions=DEFAULT_COLLISIONS, hash_mode=LEGACY, hash_func=DEFAULT_HASH_FUNC,
+                       processes=None, dp_bits=None, seed=0, max_steps=None):
+    width = hash_width(bits, hash_mode)
+    if width < 1:
+        raise ValueError(f"{bits} bits in {hash_mode} mode keeps no hash bits")
+    processes = processes or cpu_count()
+    if dp_bits is None:
+        dp_bits = default_dp_bits(width, processes)
+    expected = math.sqrt(math.pi / 2 * 2**width)
+    if max_steps is None:
+        max_steps = int(MAX_STEPS_FACTOR * collisions * expected) + processes * (CHAINS_PER_REPORT * MAX_CHAIN_FACTOR << dp_bits)
+    f = hash_x_func(bits, hash_mode, hash_func)
+    logging.info(f"Distinguished-point search for {collisions} collisions of a {width}-bit hash, "
+                 f"{processes} processes, dp_bits={dp_bits}")
+
+    results = Queue()
+    stop = Event()
+    workers = [
+        Process(target=dp_worker, args=(w, bits, hash_mode, hash_func, dp_bits, seed, results, stop))
+        for w in range(processes)
+    ]
+    for worker in workers:
+        worker.daemon = True
+        worker.start()
+
+    store = {}  # distinguished point -> (start, length)
+    found = []
+    pairs = set()
+    steps = 0
+    merges = 0
+    start_time = time.time()
+    try:
+        while len(found) < collisions and steps < max_steps:
+            try:
+                _, chain_steps, chains = results.get(timeout=1)
+            except queue.Empty:
+                if not any(worker.is_alive() for worker in workers):
+                    raise RuntimeError("All distinguished-point workers exited")
+                continue
+            steps += chain_steps
+            for dp, start, length in chains:
+                seen = store.setdefault(dp, (start, length))
+                if seen[0] == start:
+                    continue
+                merges += 1
+                pair = backtrack(f, seen, (start, length))
+                if pair is None:
+                    continue
+                a, b = sorted(pair)
+                if (a, b) in pairs:
+                    continue
+                pairs.add((a, b))
+                found.append((f(a), a, b))
+                logging.info(f"Collision {hash_label(f(a), bits, hash_mode)}: {a} and {b}")
+                if len(found) >= collisions:
+                    break
+    finally:
+        stop.set()
+        for worker in workers:
+            worker.join(timeout=5)
+            if worker.is_alive():
+                worker.terminate()
+
+    stats = {
+        'width': width,
+        'dp_bits': dp_bits,
+        'steps': steps,
+        'expected_steps_per_collision': expected,
+        'distinguished_points': len(store),
+        'merges': merges,
+        'collisions': len(found),
+        'seconds': time.time() - start_time,
+    }
+    if len(found) < collisions:
+        logging.info(f"Distinguished-point search gave up after {steps} steps ({len(store)} distinguished points).")
+    return found, stats
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Parallel distinguished-point (van Oorschot-Wiener) collision search for truncated hashes.")
+    parser.add_argument('--bits', type=int, default=DEFAULT_BITS, help='Number of bits for hash truncation.')
+    parser.add_argument('--collisions', type=int, default=DEFAULT_COLLISIONS, help='Distinct colliding pairs to find.')
+    parser.add_argument('--hash_mode', type=str, default=LEGACY, choices=list(HASH_MODES), help="Truncated hash input: 'legacy' decimal string or 'binary' 32-byte value.")
+    parser.add_argument('--hash_func', type=str, default=DEFAULT_HASH_FUNC, help='hashlib algorithm for the truncated hash.')
+    parser.add_argument('--processes', type=int, default=None, help='Worker processes (default: all cores).')
+    parser.add_argument('--dp_bits', type=int, default=None, help='Zero low bits that make a point distinguished (default: automatic).')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for the chain start points.')
+    parser.add_argument('--collisions_file', type=str, default=DEFAULT_COLLISIONS_FILE, help='Filename for collisions.')
+    parser.add_argument('--output_format', type=str, default=DEFAULT_FORMAT, choices=FORMATS, help='Format of the collisions file.')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    found, stats = find_collisions_dp(
+        args.bits, args.collisions, args.hash_mode, args.hash_func, args.processes, args.dp_bits, args.seed
+    )
+    writer = CollisionWriter(args.collisions_file, args.output_format, (stats['width'] + 7) // 8)
+    try:
+        for value, a, b in found:
+            writer.write(hash_label(value, args.bits, args.hash_mode), [a, b])
+    finally:
+        writer.close()
+    print(f"{stats['collisions']} collisions of the {stats['width']}-bit hash after {stats['steps']} steps "
+          f"({stats['steps'] / max(stats['seconds'], 1e-9):.0f}/s, expected {stats['expected_steps_per_collision']:.0f} per collision), "
+          f"{stats['distinguished_points']} distinguished points stored", file=sys.stderr)
+    if found:
+        print(f"Collisions saved to {args.collisions_file}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
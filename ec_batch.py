@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+
+from fastecdsa.curve import secp256k1
+from fastecdsa.point import Point
+
+# Constants
+P = secp256k1.p  # field prime
+DEFAULT_BATCH = 2048  # points advanced per shared inversion
+BACKENDS = ['python', 'numpy']
+DEFAULT_BACKEND = 'python'
+
+# Affine points are (x, y) tuples of ints, the point at infinity is None.
+# fastecdsa reports the point at infinity with x = 0, so callers that key on
+# x use point_x() to stay compatible with Point.x.
+
+_backend = None  # module with the batched kernels (ec_numpy), None for plain Python ints
+
+
+# Select the arithmetic behind consecutive_multiples() and multi_offsets(); worker
+# processes forked afterwards inherit the choice. 'numpy' gives identical results but is
+# not faster (see ec_numpy), it is there to cross-check the batched arithmetic.
+def set_backend(name):
+    global _backend
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown backend {name!r}, expected one of {BACKENDS}")
+    if name == 'numpy':
+        import ec_numpy
+        _backend = ec_numpy
+    else:
+        _backend = None
+
+
+# Convert a fastecdsa Point to an affine tuple
+def to_affine(point):
+    if point is None or (point.x == 0 and point.y == 0):
+        return None
+    return (point.x, point.y)
+
+
+# Convert an affine tuple back to a fastecdsa Point
+def to_point(affine, curve=secp256k1):
+    if affine is None:
+        return Point.IDENTITY_ELEMENT
+    return Point(affine[0], affine[1], curve=curve)
+
+
+# x coordinate as fastecdsa reports it
+def point_x(affine):
+    return 0 if affine is None else affine[0]
+
+
+def neg(affine):
+    if affine is None:
+        return None
+    return (affine[0], -affine[1] % P)
+
+
+# Single affine addition (one inversion), handles doubling and infinity
+def add(a, b):
+    if a is None:
+        return b
+    if b is None:
+        return a
+    x1, y1 = a
+    x2, y2 = b
+    if x1 == x2:
+        if (y1 + y2) % P == 0:
+            return None
+        lam = 3 * x1 * x1 * pow(2 * y1, -1, P) % P
+    else:
+        lam = (y2 - y1) * pow(x2 - x1, -1, P) % P
+    x3 = (lam * lam - x1 - x2) % P
+    return (x3, (lam * (x1 - x3) - y1) % P)
+
+
+# Invert every value mod p with a single modular inversion (Montgomery's trick)
+def batch_inverse(values, p=P):
+    n = len(values)
+    if n == 0:
+        return []
+    prefix = []
+    acc = 1
+    for v in values:
+        prefix.append(acc)
+        acc = acc * v % p
+    inv = pow(acc, -1, p)
+    out = [0] * n
+    for k in range(n - 1, -1, -1):
+        out[k] = inv * prefix[k] % p
+        inv = inv * values[k] % p
+    return out
+
+
+# Element-wise a[k] + b[k] sharing one inversion across the whole batch
+def batch_add(a, b):
+    out = [None] * len(a)
+    slots = []
+    denoms = []
+    for k, (p1, p2) in enumerate(zip(a, b)):
+        if p1 is None or p2 is None or p1[0] == p2[0]:
+            out[k] = add(p1, p2)  # rare cases: infinity, doubling, P + (-P)
+        else:
+            slots.append(k)
+            denoms.append(p2[0] - p1[0])
+    for k, inv in zip(slots, batch_inverse(denoms)):
+        x1, y1 = a[k]
+        x2, y2 = b[k]
+        lam = (y2 - y1) * inv % P
+        x3 = (lam * lam - x1 - x2) % P
+        out[k] = (x3, (lam * (x1 - x3) - y1) % P)
+    return out
+
+
+# base + d for every d in deltas, one shared inversion (fast path of batch_add)
+def offsets(base, deltas):
+    if base is None:
+        return list(deltas)
+    x1, y1 = base
+    if any(d is None or d[0] == x1 for d in deltas):
+        return batch_add([base] * len(deltas), deltas)
+    p = P
+    invs = batch_inverse([d[0] - x1 for d in deltas])
+    out = []
+    append = out.append
+    for (x2, y2), inv in zip(deltas, invs):
+        lam = (y2 - y1) * inv % p
+        x3 = (lam * lam - x1 - x2) % p
+        append((x3, (lam * (x1 - x3) - y1) % p))
+    return out
+
+
+# offsets() for several bases at once: base_k + d for d in deltas[:counts[k]],
+# one inversion shared by every base
+def multi_offsets(bases, deltas, counts):
+    if _backend is not None:
+        return _backend.multi_offsets(bases, deltas, counts)
+    if any(base is None or any(d is None or d[0] == base[0] for d in deltas[:n]) for base, n in zip(bases, counts)):
+        return [offsets(base, deltas[:n]) for base, n in zip(bases, counts)]
+    p = P
+    invs = batch_inverse([d[0] - base[0] for base, n in zip(bases, counts) for d in deltas[:n]])
+    out = []
+    pos = 0
+    for (x1, y1), n in zip(bases, counts):
+        block = []
+        append = block.append
+        for (x2, y2), inv in zip(deltas[:n], invs[pos:pos + n]):
+            lam = (y2 - y1) * inv % p
+            x3 = (lam * lam - x1 - x2) % p
+            append((x3, (lam * (x1 - x3) - y1) % p))
+        pos += n
+        out.append(block)
+    return out
+
+
+# [step, 2*step, ..., count*step]
+def multiples(step, count):
+    table = []
+    acc = None
+    for _ in range(count):
+        acc = add(acc, step)
+        table.append(acc)
+    return table
+
+
+# Delta tables built in this process, keyed by (step, count). Every chunk of a walk reuses
+# its table instead of paying count inversions again; callers must not modify them.
+_multiples_cache = {}
+MAX_CACHED_TABLES = 16
+
+
+# multiples() through the per-process cache
+def cached_multiples(step, count):
+    key = (step, count)
+    table = _multiples_cache.get(key)
+    if table is None:
+        if len(_multiples_cache) >= MAX_CACHED_TABLES:
+            _multiples_cache.clear()
+        table = _multiples_cache[key] = multiples(step, count)
+    return table
+
+
+# Yield start, start + step, ..., start + (count - 1) * step
+def consecutive_multiples(start, step, count, batch_size=DEFAULT_BATCH):
+    if _backend is not None:
+        yield from _backend.consecutive_multiples(start, step, count, batch_size)
+        return
+    deltas = cached_multiples(step, max(1, min(batch_size, count)))
+    base = start
+    emitted = 0
+    while emitted < count:
+        n = min(len(deltas), count - emitted)
+        block = offsets(base, deltas[:n])  # base + t*step for t = 1..n
+        yield base
+        for point in block[:-1]:
+            yield point
+        emitted += n
+        base = block[-1]
+
+
+# x coordinates of (start + a) * G, ..., (start + b - 1) * G: one shard of a parallel table build
+def x_range(task, curve=secp256k1):
+    start, a, b = task
+    first = to_affine((start + a) * curve.G)
+    return [point_x(point) for point in consecutive_multiples(first, to_affine(curve.G), b - a)]
+
+
+# Advance every point by the same stride each round; yields the points before each step
+def walk(points, stride, rounds):
+    current = list(points)
+    strides = [stride] * len(current)
+    for r in range(rounds):
+        yield current
+        if r + 1 < rounds:
+            current = batch_add(current, strides)
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+
+import os
+import mmap
+import struct
+import hashlib
+import logging
+from fastecdsa.curve import secp256k1
+from ec_batch import P, add, batch_add, consecutive_multiples, to_affine
+from scheduler import run_ordered
+
+# Constants
+N = secp256k1.q  # group order
+DEFAULT_WINDOW = 8  # in-memory table built on first use: 32 rows of 255 points, ~0.5 MiB
+DEFAULT_G_TABLE_WINDOW = 16  # disk-cached table: 16 rows of 65535 points, 64 MiB
+DEFAULT_G_TABLE_FILE = 'g_table.bin'
+CURVE_NAME = b'secp256k1'
+POINT_SIZE = 64  # x and y, 32 bytes each, big-endian
+
+# Binary table file: header (magic, version, window, curve name, rows, sha256 of the payload),
+# padded to 64 bytes, then row after row of d * 2^(window * row) * G for d = 1 .. 2^window - 1
+TABLE_MAGIC = b'GBASETB1'
+TABLE_VERSION = 1
+TABLE_HEADER = struct.Struct('<8sHH16sI32s')
+TABLE_HEADER_SIZE = 64
+
+# Table used by mul_G() and mul_G_batch() in this process (forked workers inherit it)
+_table = None
+
+
+# One row of the table: d * 2^(window * row) * G for d = 1 .. 2^window - 1, packed
+def table_row(task):
+    row, window = task
+    base = to_affine((1 << (window * row)) * secp256k1.G)
+    return b''.join(
+        x.to_bytes(32, 'big') + y.to_bytes(32, 'big')
+        for x, y in consecutive_multiples(base, base, (1 << window) - 1)
+    )
+
+
+class FixedBaseTable:
+    """
+    Precomputed multiples of G for a fixed window: k * G is the sum of one
+    table point per window-sized digit of k, so a multiplication costs
+    256 / window additions and no doublings. Single multiplications
+    accumulate in Jacobian coordinates (one inversion at the end); batches
+    add row by row with one shared inversion per row. Points are decoded
+    from the packed payload on lookup, so a memory-mapped file is used as is.
+    """
+
+    def __init__(self, payload, window):
+        self.payload = payload
+        self.window = window
+        self.rows = -(-256 // window)
+        self.row_points = (1 << window) - 1
+        self.mask = (1 << window) - 1
+        if len(payload) != self.rows * self.row_points * POINT_SIZE:
+            raise ValueError(f"Payload does not match a window {window} table")
+        self.path = None
+
+    @classmethod
+    def build(cls, window=DEFAULT_WINDOW, processes=1):
+        rows = -(-256 // window)
+        payload = b''.join(run_ordered(table_row, [(row, window) for row in range(rows)], processes))
+        return cls(payload, window)
+
+    @property
+    def nbytes(self):
+        return len(self.payload)
+
+    # d * 2^(window * row) * G as an affine tuple, None for d = 0
+    def point(self, row, d):
+        if not d:
+            return None
+        offset = (row * self.row_points + d - 1) * POINT_SIZE
+        raw = self.payload[offset:offset + POINT_SIZE]
+        return (int.from_bytes(raw[:32], 'big'), int.from_bytes(raw[32:], 'big'))
+
+    def digits(self, k):
+        window, mask = self.window, self.mask
+        return [(k >> (window * row)) & mask for row in range(self.rows)]
+
+    # k * G as an affine tuple (None for k = 0 mod n)
+    def mul(self, k):
+        p = P
+        X = Y = Z = None
+        for row, d in enumerate(self.digits(k % N)):
+            if not d:
+                continue
+            x2, y2 = self.point(row, d)
+            if Z is None:
+                X, Y, Z = x2, y2, 1
+                continue
+            # mixed Jacobian + affine addition
+            Z2 = Z * Z % p
+            H = (x2 * Z2 - X) % p
+            R = (y2 * Z2 * Z - Y) % p
+            if H == 0:  # the sum doubles or cancels a point; settle it in affine coordinates
+                acc = add(jacobian_to_affine(X, Y, Z), (x2, y2))
+                X, Y, Z = (None, None, None) if acc is None else (acc[0], acc[1], 1)
+                continue
+            H2 = H * H % p
+            H3 = H * H2 % p
+            V = X * H2 % p
+            X3 = (R * R - H3 - 2 * V) % p
+            Y = (R * (V - X3) - Y * H3) % p
+            X = X3
+            Z = Z * H % p
+        return None if Z is None else jacobian_to_affine(X, Y, Z)
+
+    # [k * G for k in ks], every row added to all accumulators with one shared inversion
+    def mul_batch(self, ks):
+        digits = [self.digits(k % N) for k in ks]
+        acc = [None] * len(ks)
+        for row in range(self.rows):
+            acc = batch_add(acc, [self.point(row, ds[row]) for ds in digits])
+        return acc
+
+
+def jacobian_to_affine(X, Y, Z):
+    zi = pow(Z, -1, P)
+    zi2 = zi * zi % P
+    return (X * zi2 % P, Y * zi2 * zi % P)
+
+
+# Write the table as a binary file (atomic rename, so readers never see half a table)
+def save_g_table(table, path):
+    header = TABLE_HEADER.pack(
+        TABLE_MAGIC, TABLE_VERSION, table.window, CURVE_NAME, table.rows,
+        hashlib.sha256(table.payload).digest()
+    )
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(header.ljust(TABLE_HEADER_SIZE, b'\0'))
+        f.write(table.payload)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    logging.info(f"Fixed-base table (window {table.window}, {table.nbytes} bytes) saved to {path}.")
+
+
+# Memory-map a table file
+def load_g_table(path, verify=False):
+    with open(path, 'rb') as f:
+        raw = f.read(TABLE_HEADER.size)
+        if len(raw) < TABLE_HEADER.size:
+            raise ValueError(f"{path} is too short to be a fixed-base table")
+        magic, version, window, curve_name, rows, checksum = TABLE_HEADER.unpack(raw)
+        if magic != TABLE_MAGIC or version != TABLE_VERSION:
+            raise ValueError(f"{path} is not a version {TABLE_VERSION} fixed-base table")
+        curve_name = curve_name.rstrip(b'\0')
+        if curve_name != CURVE_NAME:
+            raise ValueError(f"{path} was built for curve {curve_name.decode()}")
+        size = rows * ((1 << window) - 1) * POINT_SIZE
+        if os.fstat(f.fileno()).st_size != TABLE_HEADER_SIZE + size:
+            raise ValueError(f"{path} is truncated or has trailing data")
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    payload = memoryview(mm)[TABLE_HEADER_SIZE:]
+    if verify and hashlib.sha256(payload).digest() != checksum:
+        raise ValueError(f"Checksum mismatch in {path}")
+    table = FixedBaseTable(payload, window)
+    table.path = path
+    logging.info(f"Fixed-base table {path} mapped (window {window}).")
+    return table
+
+
+# Map the table file if it has the requested window, otherwise build and save it
+def load_or_build_g_table(path=DEFAULT_G_TABLE_FILE, window=DEFAULT_G_TABLE_WINDOW, processes=1):
+    if os.path.exists(path):
+        try:
+            table = load_g_table(path)
+        except ValueError as e:
+            logging.warning(f"Ignoring unreadable fixed-base table: {e}")
+        else:
+            if table.window == window:
+                return table
+            logging.info(f"Fixed-base table {path} has window {table.window}, rebuilding with {window}.")
+    logging.info(f"Building fixed-base table (window {window})...")
+    save_g_table(FixedBaseTable.build(window, processes), path)
+    return load_g_table(path)
+
+
+# Use this table for mul_G() and mul_G_batch(); call before forking workers
+def set_g_table(table):
+    global _table
+    _table = table
+
+
+def g_table():
+    global _table
+    if _table is None:
+        _table = FixedBaseTable.build(DEFAULT_WINDOW)
+    return _table
+
+
+# k * G as an affine tuple
+def mul_G(k):
+    return g_table().mul(k)
+
+
+# [k * G for k in ks] as affine tuples
+def mul_G_batch(ks):
+    return g_table().mul_batch(ks)
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+
+import hashlib
+
+# Constants
+LEGACY = 'legacy'  # sha256 of the decimal string, truncated to whole hex digits (original output)
+BINARY = 'binary'  # hash of the 32-byte big-endian x, truncated to any bit width
+HASH_MODES = (LEGACY, BINARY)
+DEFAULT_HASH_FUNC = 'sha256'
+X_BYTES = 32
+
+
+# Resolve a hashlib name, or accept a callable taking bytes and returning the digest bytes
+def resolve_hash_func(hash_func=DEFAULT_HASH_FUNC):
+    if callable(hash_func):
+        return hash_func
+    constructor = getattr(hashlib, hash_func, None)
+    if constructor is None:
+        hashlib.new(hash_func)  # raises ValueError for unknown names
+        return lambda data: hashlib.new(hash_func, data).digest()
+    return lambda data: constructor(data).digest()
+
+
+# Number of bits a truncated hash actually keeps in the given mode
+def hash_width(bits, mode=LEGACY):
+    return (bits // 4) * 4 if mode == LEGACY else bits
+
+
+# Bytes needed to store a truncated hash value
+def hash_key_bytes(bits, mode=LEGACY):
+    return max(1, (hash_width(bits, mode) + 7) // 8)
+
+
+# Hex label of a truncated hash value, as the legacy string hash would print it
+def hash_label(value, bits, mode=LEGACY):
+    digits = (hash_width(bits, mode) + 3) // 4
+    return f"{value:0{digits}x}" if digits else ''
+
+
+# Truncated hash of raw bytes as an integer
+def truncated_hash_int(data, bits, hash_func=DEFAULT_HASH_FUNC):
+    digest = resolve_hash_func(hash_func)(data)
+    if bits > 8 * len(digest):
+        raise ValueError(f"Cannot truncate a {8 * len(digest)}-bit digest to {bits} bits")
+    nbytes = (bits + 7) // 8
+    return int.from_bytes(digest[:nbytes], 'big') >> (8 * nbytes - bits)
+
+
+# Truncated hashes of a whole block of x coordinates, as integers
+def hash_x_batch(xs, bits, mode=LEGACY, hash_func=DEFAULT_HASH_FUNC):
+    if mode == LEGACY:
+        digits = bits // 4
+        if digits == 0:
+            return [0] * len(xs)
+        if hash_func == DEFAULT_HASH_FUNC:
+            sha256 = hashlib.sha256
+            return [int(sha256(str(x).encode()).hexdigest()[:digits], 16) for x in xs]
+        digest = resolve_hash_func(hash_func)
+        return [int(digest(str(x).encode()).hex()[:digits], 16) for x in xs]
+    if mode != BINARY:
+        raise ValueError(f"Unknown hash mode: {mode}")
+
+    digest = resolve_hash_func(hash_func)
+    if bits > 8 * len(digest(b'')):
+        raise ValueError(f"Cannot truncate the {hash_func} digest to {bits} bits")
+    nbytes = (bits + 7) // 8
+    shift = 8 * nbytes - bits
+    from_bytes = int.from_bytes
+    return [from_bytes(digest(x.to_bytes(X_BYTES, 'big'))[:nbytes], 'big') >> shift for x in xs]
+
+
+# Truncated hash of one x coordinate as a callable, same values as hash_x_batch([x], ...)[0]
+def hash_x_func(bits, mode=LEGACY, hash_func=DEFAULT_HASH_FUNC):
+    digest = resolve_hash_func(hash_func)
+    if mode == LEGACY:
+        digits = bits // 4
+        return lambda x: int(digest(str(x).encode()).hex()[:digits] or '0', 16)
+    if mode != BINARY:
+        raise ValueError(f"Unknown hash mode: {mode}")
+    if bits > 8 * len(digest(b'')):
+        raise ValueError(f"Cannot truncate the {hash_func} digest to {bits} bits")
+    nbytes = (bits + 7) // 8
+    shift = 8 * nbytes - bits
+    from_bytes = int.from_bytes
+    return lambda x: from_bytes(digest(x.to_bytes(X_BYTES, 'big'))[:nbytes], 'big') >> shift
+
+
+# Hash of the "TARGET" marker the giant-step loop compares against
+def target_hash(bits, mode=LEGACY, hash_func=DEFAULT_HASH_FUNC, marker=b"TARGET"):
+    if mode == LEGACY:
+        digits = bits // 4
+        return int(resolve_hash_func(hash_func)(marker).hex()[:digits] or '0', 16)
+    return truncated_hash_int(marker, bits, hash_func)
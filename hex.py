@@ -1,98 +1,108 @@
 import os
-import re
-from multiprocessing import Pool, cpu_count
+import argparse
+from itertools import islice
+from collision_store import DEFAULT_MEMORY_BUDGET, ExternalSorter
+from output_format import read_values
+from scheduler import run_ordered
 
-# Kompilierte Regex für mehrfache Nutzung
-KEYS_PATTERN = re.compile(r"Keys:\s*(.*?)")
+# Standardwerte (per Argument überschreibbar)
+DEFAULT_FOUND_KEYS_FILE = "found_keys.txt"
+DEFAULT_COLLISIONS_FILE = "collisions.txt"
+DEFAULT_OUTPUT_FILE = "HEXFOUND.txt"
+DEFAULT_CHUNK_SIZE = 65536  # Dezimalwerte pro Batch
+HEX_WIDTH = 64  # jeder Hexwert ist ein Datensatz fester Breite für den externen Sort
 
 def dec_to_hex(dec_val: int) -> str:
     """
     Konvertiert einen ganzzahligen Dezimalwert in
     eine 64-stellige Hex-Darstellung (Kleinbuchstaben).
     """
-    return format(dec_val, 'x').zfill(64)
+    return format(dec_val, 'x').zfill(HEX_WIDTH)
 
-def process_decimal(dec_str: str) -> list[str]:
+def process_decimal(dec: int) -> list[str]:
     """
-    Wandelt den Dezimalstring in int um und gibt eine Liste
-    der Hexwerte für (dec-1), dec, (dec+1) zurück.
-    Falls der String kein gültiger int ist, wird eine leere Liste zurückgegeben.
+    Gibt eine Liste der Hexwerte für (dec-1), dec, (dec+1) zurück.
+    Für dec = 0 ergibt (dec-1) wie bisher '-000...01'.
     """
-    try:
-        dec = int(dec_str)
-    except ValueError:
-        return []
-
-    # Für den Fall, dass dec = 0 ist, wollen wir (dec - 1) vermeiden? 
-    # Bei negativen Zahlen ist es meist kein Problem, aber du kannst es anpassen.
     return [
         dec_to_hex(dec - 1),
         dec_to_hex(dec),
         dec_to_hex(dec + 1)
     ]
 
-def parse_collisions(file_path: str) -> set[str]:
+def expand_chunk(decimals: list[int]) -> bytes:
     """
-    Liest die collisions.txt ein und extrahiert alle Dezimalwerte,
-    die in Zeilen mit 'Keys: [ ... ]' gefunden werden.
-    Gibt ein Set aller gefundenen Stringwerte (nur Ziffern) zurück.
+    Expandiert einen ganzen Batch von Dezimalwerten auf einmal und gibt die
+    Hexwerte als zusammenhängende 64-Byte-Datensätze zurück, damit pro Batch
+    nur ein einziges bytes-Objekt zwischen den Prozessen wandert.
     """
-    decimals = set()
-    with open(file_path, "r", encoding="utf-8") as f:
-        for line in f:
-            match = KEYS_PATTERN.search(line)
-            if match:
-                keys = match.group(1).split(",")
-                # Nur Ziffern ins Set übernehmen
-                for k in keys:
-                    k = k.strip()
-                    if k.isdigit():
-                        decimals.add(k)
-    return decimals
+    return ''.join(dec_to_hex(d) for dec in decimals for d in (dec - 1, dec, dec + 1)).encode('ascii')
 
-def process_files(found_keys_path: str, collisions_path: str, output_path: str) -> None:
+def chunks(values, size):
     """
-    Ließt found_keys.txt und collisions.txt ein, sammelt alle Dezimalwerte,
-    berechnet jeweils dec-1, dec und dec+1 als Hex und speichert
-    die einzigartigen Ergebnisse in HEXFOUND.txt.
+    Teilt einen Strom von Werten in Listen zu je size Elementen.
     """
-    # Sammeln aller Dezimalwerte in einem Set (Duplikate werden automatisch entfernt)
-    decimals = set()
-
-    # 1. found_keys.txt einlesen
-    with open(found_keys_path, "r", encoding="utf-8") as f:
-        for line in f:
-            val = line.strip()
-            if val.isdigit():
-                decimals.add(val)
-
-    # 2. collisions.txt einlesen
-    decimals.update(parse_collisions(collisions_path))
+    values = iter(values)
+    while True:
+        chunk = list(islice(values, size))
+        if not chunk:
+            return
+        yield chunk
 
-    # 3. Dezimalwerte parallel verarbeiten
-    with Pool(cpu_count()) as pool:
-        # process_decimal gibt je eine Liste zurück, die wir in eine flache Liste umwandeln
-        all_hex_values = pool.map(process_decimal, decimals)
+def process_files(found_keys_path: str, collisions_path: str, output_path: str,
+                  memory_budget: int = DEFAULT_MEMORY_BUDGET, spill_dir: str = None,
+                  processes: int = 1, chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+    """
+    Liest found_keys.txt und collisions.txt (Text, JSONL oder Binär) als Strom,
+    berechnet jeweils dec-1, dec und dec+1 als Hex und schreibt die
+    einzigartigen Ergebnisse sortiert nach HEXFOUND.txt. Sortieren und
+    Deduplizieren laufen über einen externen Sort, der Speicherbedarf bleibt
+    also bei memory_budget, egal wie groß die Eingaben sind.
+    Gibt die Anzahl der geschriebenen Hexwerte zurück.
+    """
+    sorter = ExternalSorter(HEX_WIDTH, memory_budget, spill_dir)
 
-    # 4. Liste flach machen und eindeutige Hexwerte ermitteln
-    unique_hex_values = set(hex_val for sublist in all_hex_values for hex_val in sublist)
+    # 1. + 2. Beide Dateien batchweise expandieren
+    for path in (found_keys_path, collisions_path):
+        if not os.path.exists(path):
+            continue
+        for block in run_ordered(expand_chunk, chunks(read_values(path), chunk_size), processes):
+            for offset in range(0, len(block), HEX_WIDTH):
+                sorter.add(block[offset:offset + HEX_WIDTH])
 
-    # 5. Sortierte Ausgabe
+    # 3. Sortierte Ausgabe, Duplikate liegen im Merge direkt nebeneinander
+    written = 0
+    previous = None
     with open(output_path, "w", encoding="utf-8") as f:
-        for hex_val in sorted(unique_hex_values):
-            f.write(hex_val + "\n")
+        for record in sorter.sorted_records():
+            if record != previous:
+                f.write(record.decode('ascii') + "\n")
+                written += 1
+                previous = record
+    return written
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Hex-Werte (dec-1, dec, dec+1) aller gefundenen Schlüssel und Kollisionen.")
+    parser.add_argument('--found_keys_file', type=str, default=DEFAULT_FOUND_KEYS_FILE, help='Datei mit gefundenen Schlüsseln.')
+    parser.add_argument('--collisions_file', type=str, default=DEFAULT_COLLISIONS_FILE, help='Datei mit Kollisionen.')
+    parser.add_argument('--output', type=str, default=DEFAULT_OUTPUT_FILE, help='Ausgabedatei.')
+    parser.add_argument('--memory_budget', type=int, default=DEFAULT_MEMORY_BUDGET // (1024 * 1024), help='MiB für Datensätze im RAM, bevor sortierte Läufe auf die Platte gehen.')
+    parser.add_argument('--spill_dir', type=str, default=None, help='Verzeichnis für sortierte Läufe (Standard: System-Temp).')
+    parser.add_argument('--processes', type=int, default=1, help='Prozesse für die Hex-Expansion.')
+    parser.add_argument('--chunk_size', type=int, default=DEFAULT_CHUNK_SIZE, help='Dezimalwerte pro Batch.')
+    return parser.parse_args()
 
 if __name__ == "__main__":
-    # Dateinamen anpassen, falls nötig
-    found_keys_file = "found_keys.txt"
-    collisions_file = "collisions.txt"
-    output_file = "HEXFOUND.txt"
+    args = parse_arguments()
 
-    # Prüfung: Existieren beide Dateien?
-    if not os.path.exists(found_keys_file) or not os.path.exists(collisions_file):
-        print("Eine oder beide Eingabedateien fehlen. Bitte sicherstellen, dass "
-              "'found_keys.txt' und 'collisions.txt' vorhanden sind.")
+    # Prüfung: Existiert mindestens eine der Dateien?
+    if not os.path.exists(args.found_keys_file) and not os.path.exists(args.collisions_file):
+        print(f"Keine Eingabedatei gefunden. Bitte sicherstellen, dass "
+              f"'{args.found_keys_file}' oder '{args.collisions_file}' vorhanden ist.")
     else:
         print("Verarbeite Dateien... Bitte warten.")
-        process_files(found_keys_file, collisions_file, output_file)
-        print(f"Hex-Werte wurden in '{output_file}' gespeichert.")
\ No newline at end of file
+        count = process_files(
+            args.found_keys_file, args.collisions_file, args.output,
+            args.memory_budget * 1024 * 1024, args.spill_dir, args.processes, args.chunk_size
+        )
+        print(f"{count} Hex-Werte wurden in '{args.output}' gespeichert.")
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+
+import math
+import queue
+import random
+import logging
+from multiprocessing import Event, Process, Queue, cpu_count
+from fastecdsa.curve import secp256k1
+from ec_batch import add, batch_add, point_x, to_affine
+from fixed_base import mul_G, mul_G_batch
+
+# Constants
+N = secp256k1.q  # group order
+DEFAULT_HERD = 256  # kangaroos per process, advanced together with one shared inversion
+NUM_JUMPS = 32  # size of the jump table, indexed by the bits of x just above the dp bits
+MAX_OPS_FACTOR = 16  # give up after this many times the expected 2 * sqrt(width) jumps
+TAME, WILD = 0, 1
+
+
+# Jump distances shared by every kangaroo; mean about herd_total * sqrt(width) / 4
+def make_jumps(width, herd_total, seed=0):
+    mean = max(1, herd_total * math.isqrt(width) // 4)
+    rng = random.Random(seed)
+    return [rng.randint(1, 2 * mean) for _ in range(NUM_JUMPS)]
+
+
+# Distinguished points have dp_bits zero low bits in x
+def default_dp_bits(width, herd_total):
+    return max(0, int(math.log2(max(1, math.isqrt(width) // herd_total))) - 2)
+
+
+# Tame distances are absolute scalars, wild distances are offsets from Q
+def random_distance(rng, kind, a, width):
+    return a + rng.randrange(width) if kind == TAME else rng.randrange(max(1, width // 2))
+
+
+# Worker: walk a herd of tame and wild kangaroos and report distinguished points as
+# (x, kind, distance, kangaroo, generation). The parent sends (kangaroo, generation)
+# back on `reseeds` when that kangaroo landed on another one of its kind; it then
+# starts over from a fresh random distance instead of trailing the other.
+def kangaroo_worker(worker_id, Q, a, width, herd, jumps, dp_bits, seed, results, reseeds, stop):
+    rng = random.Random(seed * 1000003 + worker_id)
+    jump_points = mul_G_batch(jumps)
+    mask = NUM_JUMPS - 1
+    dp_mask = (1 << dp_bits) - 1
+
+    kinds = [TAME if k % 2 == 0 else WILD for k in range(herd)]
+    dists = [random_distance(rng, kind, a, width) for kind in kinds]
+    points = [
+        dG if kind == TAME else add(Q, dG)
+        for kind, dG in zip(kinds, mul_G_batch(dists))
+    ]
+    generations = [0] * herd  # bumped on every re-seed, so stale requests are ignored
+
+    while not stop.is_set():
+        while True:
+            try:
+                k, generation = reseeds.get_nowait()
+            except queue.Empty:
+                break
+            if generations[k] != generation:
+                continue
+            generations[k] += 1
+            dists[k] = random_distance(rng, kinds[k], a, width)
+            dG = mul_G(dists[k])
+            points[k] = dG if kinds[k] == TAME else add(Q, dG)
+        dps = []
+        deltas = []
+        for k, P in enumerate(points):
+            x = point_x(P)
+            if x & dp_mask == 0:
+                dps.append((x, kinds[k], dists[k], k, generations[k]))
+            jump = (x >> dp_bits) & mask  # above the dp bits, which are zero at every distinguished point
+            deltas.append(jump_points[jump])
+            dists[k] += jumps[jump]
+        points = batch_add(points, deltas)
+        results.put((worker_id, herd, dps))
+    results.cancel_join_thread()  # the parent stops reading once it has a solution
+
+
+# Solve Q = k * G for k in [a, b) with parallel kangaroos and a shared distinguished-point store
+def solve_kangaroo(Q, a, b, processes=None, herd=DEFAULT_HERD, dp_bits=None, seed=0, max_ops=None):
+    width = b - a
+    if width <= 0:
+        raise ValueError(f"Empty interval [{a}, {b})")
+    processes = processes or cpu_count()
+    herd_total = processes * herd
+    if dp_bits is None:
+        dp_bits = default_dp_bits(width, herd_total)
+    if max_ops is None:
+        max_ops = MAX_OPS_FACTOR * 2 * math.isqrt(width) + herd_total * (2 << dp_bits)
+    jumps = make_jumps(width, herd_total, seed)
+    target = to_affine(Q)
+    logging.info(f"Kangaroo search over [{a:#x}, {b:#x}) with {herd_total} kangaroos, dp_bits={dp_bits}")
+
+    results = Queue()
+    reseeds = [Queue() for _ in range(processes)]
+    stop = Event()
+    workers = [
+        Process(target=kangaroo_worker, args=(w, target, a, width, herd, jumps, dp_bits, seed, results, reseeds[w], stop))
+        for w in range(processes)
+    ]
+    for worker in workers:
+        worker.daemon = True
+        worker.start()
+
+    store = {}  # x -> (kind, distance)
+    ops = 0
+    restarts = 0
+    solution = None
+    try:
+        while solution is None and ops < max_ops:
+            try:
+                worker_id, steps, dps = results.get(timeout=1)
+            except queue.Empty:
+                if not any(worker.is_alive() for worker in workers):
+                    raise RuntimeError("All kangaroo workers exited")
+                continue
+            ops += steps
+            for x, kind, dist, k, generation in dps:
+                seen = store.get(x)
+                if seen is None:
+                    store[x] = (kind, dist)
+                    continue
+                if seen[0] == kind:
+                    # Same kind, same point: the later one would only retrace the earlier one's path
+                    reseeds[worker_id].put((k, generation))
+                    restarts += 1
+                    continue
+                tame = dist if kind == TAME else seen[1]
+                wild = dist if kind == WILD else seen[1]
+                # Equal x means tame * G = +/-(Q + wild * G)
+                for k in ((tame - wild) % N, (-tame - wild) % N):
+                    if mul_G(k) == target:
+                        solution = k
+                        break
+                if solution is not None:
+                    break
+                logging.warning(f"Kangaroo collision at x={x} did not verify")
+    finally:
+        stop.set()
+        for q in reseeds:
+            q.cancel_join_thread()
+        for worker in workers:
+            worker.join(timeout=5)
+            if worker.is_alive():
+                worker.terminate()
+
+    if solution is None:
+        logging.info(f"Kangaroo search gave up after {ops} jumps ({len(store)} distinguished points, {restarts} re-seeds).")
+    else:
+        logging.info(f"Kangaroo solved key after {ops} jumps ({len(store)} distinguished points, {restarts} re-seeds).")
+    return solution
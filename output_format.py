@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+
+import os
+import re
+import json
+import struct
+
+# Constants
+TEXT = 'text'  # original human-readable files
+JSONL = 'jsonl'
+BINARY = 'binary'
+FORMATS = [TEXT, JSONL, BINARY]
+DEFAULT_FORMAT = TEXT
+READ_BYTES = 1 << 20  # bytes read at a time when streaming a binary file
+VALUE_BYTES = 32  # keys and x coordinates, big-endian
+
+# Binary record files: a 16-byte header (magic, version, kind, hash bytes), then fixed-width
+# records. Keys files hold one 32-byte value per record; collision files hold the bucket's
+# hash (hash bytes wide) followed by one member, with the members of a bucket adjacent.
+BINARY_MAGIC = b'BSGSREC1'
+BINARY_VERSION = 1
+BINARY_HEADER = struct.Struct('<8sHHI')
+KIND_KEYS = 1
+KIND_COLLISIONS = 2
+
+# Text collision line: "Hash: <hex> -> Keys: [k1, k2, ...]"
+KEYS_PATTERN = re.compile(r"Keys:\s*\[(.*)\]")
+
+
+def binary_header(kind, hash_bytes=0):
+    return BINARY_HEADER.pack(BINARY_MAGIC, BINARY_VERSION, kind, hash_bytes)
+
+
+def read_binary_header(f):
+    raw = f.read(BINARY_HEADER.size)
+    if len(raw) < BINARY_HEADER.size:
+        return None
+    magic, version, kind, hash_bytes = BINARY_HEADER.unpack(raw)
+    if magic != BINARY_MAGIC:
+        return None
+    if version != BINARY_VERSION:
+        raise ValueError(f"Unsupported record file version {version}")
+    return kind, hash_bytes
+
+
+# Append found keys; a binary file gets its header when it is created
+def write_keys(keys, path, fmt=DEFAULT_FORMAT):
+    if fmt == BINARY:
+        new = not os.path.exists(path) or os.path.getsize(path) == 0
+        with open(path, 'ab') as f:
+            if new:
+                f.write(binary_header(KIND_KEYS))
+            f.write(b''.join(key.to_bytes(VALUE_BYTES, 'big') for key in keys))
+        return
+    with open(path, 'a') as f:
+        for key in keys:
+            f.write(json.dumps({'key': key}) + '\n' if fmt == JSONL else f"{key}\n")
+
+
+class CollisionWriter:
+    """
+    Streams (hash label, members) buckets into a collisions file in the
+    chosen format. The file is only created once the first bucket arrives,
+    as the text writer always did.
+    """
+
+    def __init__(self, path, fmt=DEFAULT_FORMAT, hash_bytes=0):
+        self.path = path
+        self.fmt = fmt
+        self.hash_bytes = hash_bytes
+        self.file = None
+
+    def write(self, label, members):
+        if self.file is None:
+            self.file = open(self.path, 'wb' if self.fmt == BINARY else 'w')
+            if self.fmt == BINARY:
+                self.file.write(binary_header(KIND_COLLISIONS, self.hash_bytes))
+        if self.fmt == BINARY:
+            # a hash truncated to nothing (legacy mode, bits < 4) has an empty label
+            prefix = int(label or '0', 16).to_bytes(self.hash_bytes, 'big') if self.hash_bytes else b''
+            self.file.write(b''.join(prefix + x.to_bytes(VALUE_BYTES, 'big') for x in members))
+        elif self.fmt == JSONL:
+            self.file.write(json.dumps({'hash': label, 'keys': members}) + '\n')
+        else:
+            self.file.write(f"Hash: {label} -> Keys: {members}\n")
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+
+
+# Every key / collision member in a results file of any format, streamed in file order
+def read_values(path):
+    with open(path, 'rb') as f:
+        header = read_binary_header(f)
+        if header is not None:
+            kind, hash_bytes = header
+            size = (hash_bytes if kind == KIND_COLLISIONS else 0) + VALUE_BYTES
+            skip = size - VALUE_BYTES
+            tail = b''
+            while True:
+                block = f.read(READ_BYTES)
+                if not block:
+                    break
+                block = tail + block
+                end = len(block) - len(block) % size
+                for offset in range(skip, end, size):
+                    yield int.from_bytes(block[offset:offset + VALUE_BYTES], 'big')
+                tail = block[end:]
+            return
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith('{'):
+                record = json.loads(line)
+                if 'key' in record:
+                    yield int(record['key'])
+                else:
+                    yield from (int(k) for k in record.get('keys', []))
+            elif line.isdigit():
+                yield int(line)
+            else:
+                match = KEYS_PATTERN.search(line)
+                if match:
+                    for k in match.group(1).split(','):
+                        k = k.strip()
+                        if k.isdigit():
+                            yield int(k)
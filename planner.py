@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+
+import os
+import math
+import time
+import pickle
+import random
+import tempfile
+from fastecdsa.curve import secp256k1
+from bsgs_table import DEFAULT_FILTER_FP_RATE, DEFAULT_FP_BITS, CompactBabyTable, filter_geometry, load_or_build_tiered_table
+from ec_batch import consecutive_multiples, point_x, to_affine
+from hashing import DEFAULT_HASH_FUNC, LEGACY, hash_x_batch
+from scheduler import default_chunk_size, plan_shards
+
+# Constants
+MAX_M = (1 << 32) - 1  # compact table indices are 32-bit
+DICT_ENTRY_BYTES = 200  # 256-bit int key, one-element list and dict slot
+CALIBRATION_SAMPLES = 2048
+SHARD_SAMPLES = 16  # scalar multiplications timed for the per-shard cost
+CHUNK_SECONDS = 60  # longest planned chunk, so results reach the checkpoint at least this often
+TABLES = ('dict', 'compact', 'tiered')
+
+# Seconds per operation on one core, used when the rates are not measured
+DEFAULT_RATES = {
+    'baby': 6e-6,  # one batched baby step
+    'merge': 3e-7,  # one baby step handed back to the parent and added to the table (serial)
+    'shard': 1e-4,  # start point of one build shard (a scalar multiplication)
+    'giant': 6e-6,  # one batched giant step
+    'hash': 1e-6,  # one truncated hash
+    'lookup_dict': 2e-7,  # one dict probe
+    'lookup_compact': 2e-6,  # one fingerprint bisect
+    'lookup_tiered': 3e-6,  # one filter probe (misses never reach the disk)
+}
+
+
+# Bytes per baby-step entry and number of table copies held at once
+def table_footprint(table, processes, fp_bits=DEFAULT_FP_BITS):
+    if table == 'compact':
+        return fp_bits // 8 + 4, 1  # one memory-mapped copy shared by all workers
+    if table == 'tiered':
+        nbits, _ = filter_geometry(1 << 20, DEFAULT_FILTER_FP_RATE)
+        return nbits / 8 / (1 << 20), 1  # only the filter is in RAM, the table is on disk
+    return DICT_ENTRY_BYTES, processes + 1  # parent plus one copy per worker
+
+
+# Offsets covered by one giant step
+def giant_stride(m, symmetric=False):
+    return 2 * m - 1 if symmetric else m
+
+
+# Time the hot operations on this machine (takes a fraction of a second)
+def measure_rates(samples=CALIBRATION_SAMPLES, hash_mode=LEGACY, hash_func=DEFAULT_HASH_FUNC):
+    G = to_affine(secp256k1.G)
+    t0 = time.perf_counter()
+    xs = [point_x(P) for P in consecutive_multiples(G, G, samples)]
+    t1 = time.perf_counter()
+    hash_x_batch(xs, 32, hash_mode, hash_func)
+    t2 = time.perf_counter()
+    # What the parent does with a shard a worker hands back: unpickle it and fill the table
+    table = {x: [i] for i, x in enumerate(pickle.loads(pickle.dumps(xs)))}
+    t3 = time.perf_counter()
+    for _ in range(SHARD_SAMPLES):
+        to_affine(random.randrange(1, secp256k1.q) * secp256k1.G)
+    t4 = time.perf_counter()
+
+    probes = [random.getrandbits(256) for _ in range(samples)]
+    t5 = time.perf_counter()
+    for x in probes:
+        x in table
+    t6 = time.perf_counter()
+    compact = CompactBabyTable.build(samples)
+    t7 = time.perf_counter()
+    for x in probes:
+        x in compact
+    t8 = time.perf_counter()
+    with tempfile.TemporaryDirectory() as tmp:
+        tiered = load_or_build_tiered_table(os.path.join(tmp, 'calibration.bin'), samples)
+        t9 = time.perf_counter()
+        for x in probes:
+            x in tiered
+        t10 = time.perf_counter()
+        tiered.close()
+
+    step = (t1 - t0) / samples
+    return {
+        'baby': step,
+        'giant': step,
+        'hash': (t2 - t1) / samples,
+        'merge': (t3 - t2) / samples,
+        'shard': (t4 - t3) / SHARD_SAMPLES,
+        'lookup_dict': (t6 - t5) / samples,
+        'lookup_compact': (t8 - t7) / samples,
+        'lookup_tiered': (t10 - t9) / samples,
+    }
+
+
+# Wall time of a table build sharded over `processes` workers: the baby steps run in
+# parallel, each shard pays for its start point, and the parent merges every entry serially
+def build_seconds(m, processes, rates):
+    shards = len(plan_shards(m, processes))
+    return (m * rates['baby'] + shards * rates['shard']) / processes + m * rates['merge']
+
+
+# Estimate memory, step count and wall time for one m / table layout
+def estimate(widths, m, table, processes, symmetric=False, rates=None, fp_bits=DEFAULT_FP_BITS, table_cached=False):
+    rates = rates or DEFAULT_RATES
+    stride = giant_stride(m, symmetric)
+    entry_bytes, copies = table_footprint(table, processes, fp_bits)
+    steps = [-(-w // stride) for w in widths]
+    per_step = rates['giant'] + rates['hash'] + rates[f'lookup_{table}']
+    build_time = 0.0 if table_cached else build_seconds(m, processes, rates)
+    search_time = sum(steps) * per_step / processes
+    # Several chunks per worker for load balance, none longer than CHUNK_SECONDS
+    chunk_size = min(default_chunk_size(max(steps, default=1), processes), max(1, int(CHUNK_SECONDS / per_step)))
+    return {
+        'm': m,
+        'table': table,
+        'symmetric': symmetric,
+        'stride': stride,
+        'processes': processes,
+        'table_bytes': int(m * entry_bytes * copies),
+        'targets': len(widths),
+        'giant_steps': sum(steps),
+        'max_steps_per_target': max(steps, default=0),
+        'chunk_size': chunk_size,
+        'build_seconds': build_time,
+        'search_seconds': search_time,
+        'total_seconds': build_time + search_time,
+    }
+
+
+# Pick m and table layout that fit the RAM budget and minimise wall time.
+# The baby steps are split over all cores like the giant steps, but the parent merges
+# every entry on its own, so a baby step costs baby / cores + merge of wall time and
+# the unconstrained optimum is m = sqrt(total width * step cost / (cores * that cost)).
+def plan_search(widths, ram_bytes, processes, symmetric=False, rates=None, fp_bits=DEFAULT_FP_BITS, tables=TABLES):
+    rates = rates or DEFAULT_RATES
+    total = max(1, sum(widths))
+    best = None
+    for table in tables:
+        entry_bytes, copies = table_footprint(table, processes, fp_bits)
+        per_step = rates['giant'] + rates['hash'] + rates[f'lookup_{table}']
+        baby_cost = rates['baby'] / processes + rates['merge']
+        m_opt = math.isqrt(int(total * per_step / (processes * baby_cost * (2 if symmetric else 1))))
+        m_cap = int(ram_bytes // (entry_bytes * copies))
+        m = max(1, min(m_opt, m_cap, MAX_M, total))
+        plan = estimate(widths, m, table, processes, symmetric, rates, fp_bits)
+        if best is None or plan['total_seconds'] < best['total_seconds']:
+            best = plan
+    return best
+
+
+def format_duration(seconds):
+    seconds = int(seconds)
+    days, seconds = divmod(seconds, 86400)
+    hours, seconds = divmod(seconds, 3600)
+    minutes, seconds = divmod(seconds, 60)
+    if days:
+        return f"{days}d {hours}h {minutes}m"
+    if hours:
+        return f"{hours}h {minutes}m {seconds}s"
+    return f"{minutes}m {seconds}s"
+
+
+# Human-readable summary for --dry_run
+def format_plan(plan):
+    return "\n".join([
+        f"Targets:          {plan['targets']}",
+        f"Table:            {plan['table']} (m={plan['m']}, symmetric={plan['symmetric']}, stride={plan['stride']})",
+        f"Table memory:     {plan['table_bytes'] / 2**20:.1f} MiB" + (" (filter only, the table is on disk)" if plan['table'] == 'tiered' else ""),
+        f"Processes:        {plan['processes']}",
+        f"Giant steps:      {plan['giant_steps']} total, {plan['max_steps_per_target']} for the widest target",
+        f"Chunk size:       {plan['chunk_size']} giant steps",
+        f"Table build:      {format_duration(plan['build_seconds'])}",
+        f"Giant steps ETA:  {format_duration(plan['search_seconds'])}",
+        f"Total ETA:        {format_duration(plan['total_seconds'])}",
+    ])
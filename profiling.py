@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+
+import os
+import io
+import sys
+import json
+import time
+import pickle
+import pstats
+import logging
+import cProfile
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from telemetry import current_rss, write_atomic
+
+# Constants
+PICKLE_SAMPLE = 8  # worker results are pickled once more, for measurement, every this many chunks
+TOP_FUNCTIONS = 25  # functions listed from the merged cProfile samples
+MIB = 1024 * 1024
+
+# Profiler of this process; None turns every hook into a no-op
+_profiler = None
+
+
+class StageProfiler:
+    """
+    Per-stage wall time, calls and items, plus net allocated bytes and peak
+    traced memory when tracemalloc is on. Stages are timed per chunk or
+    per batch, never per step, so the timers cost little next to the work
+    they measure. Workers collect into their own instance and hand a
+    snapshot back with every chunk result; the parent merges the snapshots
+    into one report.
+    """
+
+    def __init__(self, memory=False, cprofile_every=0):
+        self.memory = memory
+        self.cprofile_every = cprofile_every
+        self.pid = os.getpid()
+        self.stats = {}  # stage -> [seconds, calls, items, net alloc bytes, peak bytes]
+        self.rss = {}  # pid -> peak RSS seen
+        self.chunks = 0
+        self.cprofile = None  # merged pstats.Stats
+        self.started = time.perf_counter()
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def add(self, name, seconds, items=0, alloc=0, peak=0, calls=1):
+        s = self.stats.get(name)
+        if s is None:
+            s = self.stats[name] = [0.0, 0, 0, 0, 0]
+        s[0] += seconds
+        s[1] += calls
+        s[2] += items
+        s[3] += alloc
+        s[4] = max(s[4], peak)
+
+    def seconds(self, name):
+        s = self.stats.get(name)
+        return s[0] if s else 0.0
+
+    @contextmanager
+    def stage(self, name, items=0):
+        if self.memory:
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            if self.memory:
+                current, peak = tracemalloc.get_traced_memory()
+                self.add(name, seconds, items, current - before, peak - before)
+            else:
+                self.add(name, seconds, items)
+
+    # Time spent waiting for the items of an iterator (e.g. chunk results from a pool), as one call
+    def timed_iter(self, name, iterable):
+        it = iter(iterable)
+        seconds = 0.0
+        items = 0
+        perf_counter = time.perf_counter
+        try:
+            while True:
+                start = perf_counter()
+                try:
+                    item = next(it)
+                except StopIteration:
+                    seconds += perf_counter() - start
+                    return
+                seconds += perf_counter() - start
+                items += 1
+                yield item
+        finally:
+            self.add(name, seconds, items)
+
+    # Hand the stats collected since the last snapshot to the parent and start over
+    def snapshot(self, cprofile_stats=None):
+        snap = {'pid': os.getpid(), 'stats': self.stats, 'rss': current_rss(), 'cprofile': cprofile_stats}
+        self.stats = {}
+        return snap
+
+    def merge(self, snap):
+        for name, (seconds, calls, items, alloc, peak) in snap['stats'].items():
+            self.add(name, seconds, items, alloc, peak, calls)
+        self.rss[snap['pid']] = max(self.rss.get(snap['pid'], 0), snap['rss'])
+        self.chunks += 1
+        if snap['cprofile'] is not None:
+            sample = _CProfileSample(snap['cprofile'])
+            if self.cprofile is None:
+                self.cprofile = pstats.Stats(sample)
+            else:
+                self.cprofile.add(sample)
+
+    def report_data(self):
+        self.rss[os.getpid()] = max(self.rss.get(os.getpid(), 0), current_rss())
+        return {
+            'wall_seconds': time.perf_counter() - self.started,
+            'chunks': self.chunks,
+            'processes': len(self.rss),
+            'peak_rss': max(self.rss.values()),
+            'memory_traced': self.memory,
+            'stages': {
+                name: {'seconds': s[0], 'calls': s[1], 'items': s[2], 'net_alloc_bytes': s[3], 'peak_bytes': s[4]}
+                for name, s in self.stats.items()
+            },
+        }
+
+    def report(self):
+        data = self.report_data()
+        total = sum(s['seconds'] for s in data['stages'].values()) or 1e-9
+        lines = [
+            f"Profile: {data['wall_seconds']:.2f}s wall, {data['chunks']} chunks, "
+            f"{data['processes']} processes, peak RSS {data['peak_rss'] / MIB:.1f} MiB "
+            f"(stage seconds add up over all processes)",
+            f"{'stage':<18}{'seconds':>10}{'share':>8}{'calls':>10}{'items':>12}{'items/s':>12}"
+            + (f"{'alloc MiB':>11}{'peak MiB':>10}" if data['memory_traced'] else ''),
+        ]
+        for name, s in sorted(data['stages'].items(), key=lambda kv: -kv[1]['seconds']):
+            rate = f"{s['items'] / s['seconds']:.0f}" if s['items'] and s['seconds'] > 0 else '-'
+            line = (f"{name:<18}{s['seconds']:>10.3f}{s['seconds'] / total:>8.1%}{s['calls']:>10}"
+                    f"{s['items']:>12}{rate:>12}")
+            if data['memory_traced']:
+                line += f"{s['net_alloc_bytes'] / MIB:>11.2f}{s['peak_bytes'] / MIB:>10.2f}"
+            lines.append(line)
+        if self.cprofile is not None:
+            out = io.StringIO()
+            self.cprofile.stream = out
+            self.cprofile.sort_stats('cumulative').print_stats(TOP_FUNCTIONS)
+            lines.append(f"cProfile samples (every {self.cprofile_every}th chunk):")
+            lines.append(out.getvalue().rstrip())
+        return '\n'.join(lines)
+
+
+# pstats.Stats loads anything with create_stats() and a stats dict
+class _CProfileSample:
+    def __init__(self, stats):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+# Turn profiling on for this process and the workers it forks from now on
+def enable(memory=False, cprofile_every=0):
+    global _profiler
+    _profiler = StageProfiler(memory, cprofile_every)
+    return _profiler
+
+
+def active():
+    return _profiler
+
+
+# Context manager timing one stage; a shared no-op when profiling is off
+def stage(name, items=0):
+    return nullcontext() if _profiler is None else _profiler.stage(name, items)
+
+
+# A forked worker starts with a copy of the parent's stats; give it its own profiler
+def _worker_profiler():
+    global _profiler
+    if _profiler.pid != os.getpid():
+        _profiler = StageProfiler(_profiler.memory, _profiler.cprofile_every)
+    return _profiler
+
+
+# Pool task wrapper: task = (func, inner task) -> (func(inner task), profile snapshot)
+def call_profiled(task):
+    func, inner = task
+    prof = _worker_profiler()
+    prof.chunks += 1
+    sample = None
+    if prof.cprofile_every and prof.chunks % prof.cprofile_every == 1 % prof.cprofile_every:
+        cp = cProfile.Profile()
+        cp.enable()
+        try:
+            result = func(inner)
+        finally:
+            cp.disable()
+        cp.create_stats()
+        sample = cp.stats
+    else:
+        result = func(inner)
+    if prof.chunks % PICKLE_SAMPLE == 1:
+        start = time.perf_counter()
+        size = len(pickle.dumps(result, pickle.HIGHEST_PROTOCOL))
+        prof.add('pickle_result', time.perf_counter() - start, size)
+    return result, prof.snapshot(sample)
+
+
+# Parent side: print the merged report and optionally save it (JSON, plus .pstats with cProfile samples)
+def finish(path=None):
+    if _profiler is None:
+        return
+    text = _profiler.report()
+    print(text, file=sys.stderr)
+    logging.info(text)
+    if path:
+        write_atomic(path, json.dumps(_profiler.report_data(), indent=2))
+        if _profiler.cprofile is not None:
+            _profiler.cprofile.dump_stats(f"{path}.pstats")
+        logging.info(f"Profile saved to {path}.")
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+
+import os
+import queue
+import logging
+import threading
+from multiprocessing import Queue
+from fastecdsa.curve import secp256k1
+from ec_batch import neg, to_affine
+from fixed_base import mul_G
+
+# Constants
+N = secp256k1.q  # group order
+VERIFY_BATCH = 256  # candidates verified and written per fsync at most
+DEFAULT_VERIFIED_KEYS_FILE = 'verified_keys.txt'
+
+
+# Check a candidate scalar against Q: k if k * G == Q, N - k if k * G == -Q, else None
+def verify_key(Q, k):
+    P = mul_G(k)
+    if P == Q:
+        return k % N
+    if P == neg(Q):
+        return (N - k) % N
+    return None
+
+
+class ResultWriter(threading.Thread):
+    """
+    Writer/verifier stage for candidate keys. Workers put (target, k) on
+    the shared queue the moment a table hit occurs; this thread drains
+    whatever is waiting, checks each candidate against its target and
+    appends the verified ones as "pubkey hex decimal" lines with an fsync
+    per batch. Keys already in the file (from an earlier run) are skipped.
+    """
+
+    def __init__(self, path, pubkeys, points, results=None):
+        super().__init__(daemon=True)
+        self.path = path
+        self.pubkeys = pubkeys
+        self.points = points  # converted on use, so a memory-mapped target cache is never read in full
+        self.queue = results if results is not None else Queue()
+        self.verified = []
+        self.rejected = 0
+        self.seen = set()
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                for line in f:
+                    fields = line.split()
+                    if len(fields) == 3:
+                        self.seen.add((fields[0], int(fields[1], 16)))
+
+    # Parent side: queue a candidate found outside the pool (replay, kangaroo)
+    def submit(self, t, k):
+        self.queue.put((t, k))
+
+    def run(self):
+        done = False
+        while not done:
+            batch = [self.queue.get()]
+            while len(batch) < VERIFY_BATCH:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            if None in batch:
+                done = True
+                batch = [item for item in batch if item is not None]
+            self._write(self._verify(batch))
+
+    def _verify(self, batch):
+        verified = []
+        for t, k in batch:
+            Q = self.points[t]
+            key = None if Q is None else verify_key(to_affine(Q), k)
+            if key is None:
+                self.rejected += 1
+                logging.debug(f"Candidate {k} did not verify against target {t}")
+                continue
+            record = (self.pubkeys[t], key)
+            if record not in self.seen:
+                self.seen.add(record)
+                verified.append(record)
+        return verified
+
+    def _write(self, verified):
+        if not verified:
+            return
+        try:
+            with open(self.path, 'a') as f:
+                for pubkey, key in verified:
+                    f.write(f"{pubkey} {key:064x} {key}\n")
+                f.flush()
+                os.fsync(f.fileno())
+        except Exception as e:
+            logging.error(f"Error saving verified keys to {self.path}: {e}")
+        for pubkey, key in verified:
+            logging.info(f"Verified key for {pubkey}: {key:064x}")
+        self.verified.extend(verified)
+
+    # Flush everything still queued and stop
+    def close(self):
+        self.queue.put(None)
+        self.join()
+        logging.info(f"{len(self.verified)} verified keys written to {self.path}, {self.rejected} candidates rejected.")
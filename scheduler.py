@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+
+import logging
+from multiprocessing import Pool, cpu_count
+
+# Constants
+CHUNKS_PER_WORKER = 8  # enough chunks that fast workers pick up the slack of slow ones
+MAX_SHARD = 1 << 20  # table-build shard size cap, bounds what a worker hands back at once
+
+
+# Chunk size that gives every worker several chunks of the j range
+def default_chunk_size(steps, workers):
+    return max(1, -(-steps // (workers * CHUNKS_PER_WORKER)))
+
+
+# Split the giant-step range [0, steps) of every target into (target, j0, j1) tasks.
+# steps is one count for all targets or a {target: count} dict for per-target intervals.
+# Chunks are interleaved across targets so every target progresses at the same pace.
+def plan_chunks(targets, steps, workers=None, chunk_size=None):
+    workers = workers or cpu_count()
+    counts = steps if isinstance(steps, dict) else dict.fromkeys(targets, steps)
+    chunk_size = chunk_size or default_chunk_size(max(counts.values(), default=1), workers)
+    per_target = [
+        [(t, j0, min(j0 + chunk_size, counts[t])) for j0 in range(0, counts[t], chunk_size)]
+        for t in targets
+    ]
+    tasks = []
+    for round_ in range(max((len(c) for c in per_target), default=0)):
+        for chunks in per_target:
+            if round_ < len(chunks):
+                tasks.append(chunks[round_])
+    return tasks
+
+
+# Lockstep tasks (j0, j1, targets): each chunk walks every target whose range reaches j0,
+# so all targets share one batch per step. steps is a {target: count} dict.
+def plan_lockstep_chunks(steps, workers=None, chunk_size=None):
+    workers = workers or cpu_count()
+    longest = max(steps.values(), default=0)
+    chunk_size = chunk_size or default_chunk_size(max(1, longest), workers)
+    return [
+        (j0, min(j0 + chunk_size, longest), tuple(t for t in sorted(steps) if j0 < steps[t]))
+        for j0 in range(0, longest, chunk_size)
+    ]
+
+
+# Split the index range [0, count) into (a, b) shards for a parallel table build
+def plan_shards(count, workers=None):
+    workers = workers or cpu_count()
+    size = max(1, min(MAX_SHARD, -(-count // (workers * CHUNKS_PER_WORKER))))
+    return [(a, min(a + size, count)) for a in range(0, count, size)]
+
+
+# Like run_chunks, but results come back in task order (table builds must stay deterministic).
+# With one process the tasks run inline, without a pool.
+def run_ordered(func, tasks, processes=None):
+    processes = processes or cpu_count()
+    if processes == 1:
+        yield from map(func, tasks)
+        return
+    with Pool(processes=processes) as pool:
+        yield from pool.imap(func, tasks, chunksize=1)
+
+
+# Run tasks on a process pool; idle workers pull the next chunk from the shared
+# task queue, so the load balances itself. Results arrive in completion order.
+def run_chunks(func, tasks, processes=None, initializer=None, initargs=()):
+    processes = processes or cpu_count()
+    logging.info(f"Scheduling {len(tasks)} chunks on {processes} processes...")
+    with Pool(processes=processes, initializer=initializer, initargs=initargs) as pool:
+        for done, result in enumerate(pool.imap_unordered(func, tasks, chunksize=1), 1):
+            if done % max(1, len(tasks) // 10) == 0:
+                logging.debug(f"Completed {done} out of {len(tasks)} chunks")
+            yield result
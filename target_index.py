@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+
+import os
+import mmap
+import struct
+import logging
+from itertools import islice
+from fastecdsa.curve import secp256k1
+from fastecdsa.point import Point
+from collision_store import DEFAULT_MEMORY_BUDGET, ExternalSorter, FingerprintSet
+from ec_batch import P, consecutive_multiples, to_affine
+from scheduler import plan_shards, run_ordered
+
+# Constants
+N = secp256k1.q  # group order
+CACHE_SUFFIX = '.points'  # default cache file: the target file's name plus this
+PARSE_LINES = 65536  # target lines decompressed per task
+SCAN_RECORDS = 1 << 16  # cache records read at a time while building the index
+COMPRESSED, UNCOMPRESSED = 0, 1
+
+# Cache file: header (magic, version, size and mtime of the target file it was built from,
+# point count), padded to 64 bytes, then the distinct on-curve targets sorted by (x, y),
+# each as x and y (32 bytes, big-endian) and the form byte of its first spelling
+CACHE_MAGIC = b'TGTPTS01'
+CACHE_VERSION = 1
+CACHE_HEADER = struct.Struct('<8sHQqQ')
+CACHE_HEADER_SIZE = 64
+RECORD_SIZE = 65
+
+# Cache and index used by probe_shard() in this process (forked workers inherit them)
+_cache = None
+
+
+# One pubkey (hex, 02/03 compressed or 04 uncompressed) as (x, y, form), None if it
+# is malformed or not on the curve
+def parse_pubkey(pubkey):
+    prefix = pubkey[:2]
+    try:
+        if prefix == '04' and len(pubkey) == 130:
+            x, y = int(pubkey[2:66], 16), int(pubkey[66:], 16)
+            form = UNCOMPRESSED
+            if x >= P or y >= P or (y * y - x * x * x - 7) % P:
+                return None
+        elif prefix in ('02', '03') and len(pubkey) == 66:
+            x = int(pubkey[2:], 16)
+            form = COMPRESSED
+            if x >= P:
+                return None
+            alpha = (x * x * x + 7) % P
+            y = pow(alpha, (P + 1) // 4, P)
+            if y * y % P != alpha:
+                return None
+            if y % 2 != (1 if prefix == '03' else 0):
+                y = P - y
+        else:
+            return None
+    except ValueError:
+        return None
+    return x, y, form
+
+
+# Worker task: target lines -> (packed records of the valid ones, number rejected)
+def parse_lines(lines):
+    records = []
+    rejected = 0
+    for line in lines:
+        fields = line.split()
+        point = parse_pubkey(fields[0].lower()) if fields else None
+        if point is None:
+            if fields:
+                rejected += 1
+            continue
+        x, y, form = point
+        records.append(x.to_bytes(32, 'big') + y.to_bytes(32, 'big') + bytes([form]))
+    return b''.join(records), rejected
+
+
+def line_chunks(path, size=PARSE_LINES):
+    with open(path, 'r') as f:
+        while True:
+            chunk = list(islice(f, size))
+            if not chunk:
+                return
+            yield chunk
+
+
+def source_stamp(path):
+    st = os.stat(path)
+    return st.st_size, st.st_mtime_ns
+
+
+# Stream the target file, decompress and validate every key, and write the distinct
+# points sorted by (x, y). The external sort keeps memory at memory_budget.
+def build_target_cache(source, path, processes=1, memory_budget=DEFAULT_MEMORY_BUDGET, spill_dir=None):
+    size, mtime = source_stamp(source)
+    sorter = ExternalSorter(RECORD_SIZE, memory_budget, spill_dir)
+    rejected = 0
+    for records, bad in run_ordered(parse_lines, line_chunks(source), processes):
+        rejected += bad
+        for offset in range(0, len(records), RECORD_SIZE):
+            sorter.add(records[offset:offset + RECORD_SIZE])
+
+    count = 0
+    duplicates = 0
+    previous = None
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(b'\0' * CACHE_HEADER_SIZE)
+        for record in sorter.sorted_records():
+            if previous is not None and record[:64] == previous[:64]:
+                duplicates += 1
+                continue
+            f.write(record)
+            previous = record
+            count += 1
+        f.seek(0)
+        f.write(CACHE_HEADER.pack(CACHE_MAGIC, CACHE_VERSION, size, mtime, count))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    logging.info(f"Target cache {path}: {count} distinct points, {duplicates} duplicates dropped, "
+                 f"{rejected} invalid keys rejected.")
+    return count
+
+
+class TargetCache:
+    """
+    Memory-mapped file of decompressed, validated and deduplicated target
+    points, sorted by x, plus an in-RAM index from the top 64 bits of x to
+    the first record with that prefix. Probing an x costs one hash lookup
+    whatever the number of targets; records are decoded only on a hit.
+    pubkeys and points are index-addressable views for ResultWriter.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            raw = f.read(CACHE_HEADER.size)
+            if len(raw) < CACHE_HEADER.size:
+                raise ValueError(f"{path} is too short to be a target cache")
+            magic, version, self.source_size, self.source_mtime, self.count = CACHE_HEADER.unpack(raw)
+            if magic != CACHE_MAGIC or version != CACHE_VERSION:
+                raise ValueError(f"{path} is not a version {CACHE_VERSION} target cache")
+            if os.fstat(f.fileno()).st_size != CACHE_HEADER_SIZE + self.count * RECORD_SIZE:
+                raise ValueError(f"{path} is truncated or has trailing data")
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if self.count else b''
+        self.path = path
+        self.index = None
+        self.pubkeys = _View(self.pubkey, self.count)
+        self.points = _View(lambda t: Point(*self.point(t), curve=secp256k1), self.count)
+
+    def __len__(self):
+        return self.count
+
+    def _record(self, t):
+        offset = CACHE_HEADER_SIZE + t * RECORD_SIZE
+        return self._mm[offset:offset + RECORD_SIZE]
+
+    def x(self, t):
+        return int.from_bytes(self._record(t)[:32], 'big')
+
+    # Target t as an affine tuple
+    def point(self, t):
+        raw = self._record(t)
+        return int.from_bytes(raw[:32], 'big'), int.from_bytes(raw[32:64], 'big')
+
+    # Target t as a pubkey string in the form it was listed in (lowercase hex)
+    def pubkey(self, t):
+        raw = self._record(t)
+        if raw[64] == UNCOMPRESSED:
+            return '04' + raw[:64].hex()
+        return ('03' if raw[63] & 1 else '02') + raw[:32].hex()
+
+    # One pass over the records: first position of every 64-bit x prefix
+    def build_index(self):
+        index = FingerprintSet(self.count)
+        for first in range(0, self.count, SCAN_RECORDS):
+            n = min(SCAN_RECORDS, self.count - first)
+            block = self._mm[CACHE_HEADER_SIZE + first * RECORD_SIZE:CACHE_HEADER_SIZE + (first + n) * RECORD_SIZE]
+            for i in range(n):
+                index.add(int.from_bytes(block[i * RECORD_SIZE:i * RECORD_SIZE + 8], 'big'), first + i)
+        self.index = index
+        logging.info(f"Target index: {len(index)} prefixes, {index.nbytes} bytes.")
+        return index
+
+    # Targets whose x equals x (a point and its negation share one)
+    def lookup(self, x):
+        t = self.index.get(x >> 192)
+        if t is None:
+            return []
+        hits = []
+        while t < self.count and self.x(t) >> 192 == x >> 192:
+            if self.x(t) == x:
+                hits.append(t)
+            t += 1
+        return hits
+
+
+class _View:
+    def __init__(self, getter, count):
+        self._getter = getter
+        self._count = count
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, t):
+        if not 0 <= t < self._count:
+            raise IndexError(t)
+        return self._getter(t)
+
+
+# Open the cache if it was built from the current target file, otherwise rebuild it
+def load_or_build_target_cache(source, path=None, processes=1, memory_budget=DEFAULT_MEMORY_BUDGET, spill_dir=None):
+    path = path or source + CACHE_SUFFIX
+    if os.path.exists(path):
+        try:
+            cache = TargetCache(path)
+        except ValueError as e:
+            logging.warning(f"Ignoring unreadable target cache: {e}")
+        else:
+            if (cache.source_size, cache.source_mtime) == source_stamp(source):
+                logging.info(f"Reusing target cache {path} ({len(cache)} points).")
+                cache.build_index()
+                return cache
+            logging.info(f"{source} changed since {path} was built, rebuilding.")
+    logging.info(f"Building target cache {path} from {source}...")
+    build_target_cache(source, path, processes, memory_budget, spill_dir)
+    cache = TargetCache(path)
+    cache.build_index()
+    return cache
+
+
+# Use this cache for probe_shard(); call before forking workers
+def set_target_cache(cache):
+    global _cache
+    _cache = cache
+
+
+# Worker task: walk k * G for k in [lo + a, lo + b) and probe every x against the index.
+# Returns [(target, key)], key = k for Q = k * G and N - k for Q = -k * G.
+def probe_shard(task):
+    lo, a, b = task
+    index, lookup = _cache.index, _cache.lookup
+    found = []
+    first = to_affine((lo + a) * secp256k1.G)
+    for k, S in enumerate(consecutive_multiples(first, to_affine(secp256k1.G), b - a), lo + a):
+        if S is None or index.get(S[0] >> 192) is None:
+            continue
+        for t in lookup(S[0]):
+            found.append((t, k % N if _cache.point(t)[1] == S[1] else (N - k) % N))
+    return found
+
+
+# Walk [lo, hi) once against every target in the cache; yields (target, key) in k order
+def search_interval(cache, lo, hi, processes=1):
+    set_target_cache(cache)
+    shards = plan_shards(hi - lo, processes)
+    logging.info(f"Indexed search over [{lo:#x}, {hi:#x}) against {len(cache)} targets, {len(shards)} shards.")
+    for done, found in enumerate(run_ordered(probe_shard, [(lo, a, b) for a, b in shards], processes), 1):
+        yield from found
+        if done % max(1, len(shards) // 10) == 0:
+            logging.debug(f"Completed {done} out of {len(shards)} shards")
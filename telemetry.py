@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import json
+import time
+import logging
+import threading
+from multiprocessing import Array, Value
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+# Constants
+DEFAULT_REPORT_INTERVAL = 30  # seconds between reports
+PROGRESS_STEPS = 4096  # giant steps between counter updates inside the kernel
+METRIC_PREFIX = 'bsgs'
+
+
+# Current resident set size of this process in bytes (peak RSS where /proc is missing)
+def current_rss():
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        if resource is None:
+            return 0
+        scale = 1 if sys.platform == 'darwin' else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+class SharedCounters:
+    """
+    Lock-free progress counters in shared memory. Each worker owns one
+    slot (steps, hits, RSS), so it can bump it without a lock; per-target
+    step counts are shared by all workers and take the array's lock, which
+    only happens every PROGRESS_STEPS steps.
+    """
+
+    def __init__(self, workers, num_targets):
+        self.workers = workers
+        self.worker_steps = Array('Q', workers, lock=False)
+        self.worker_hits = Array('Q', workers, lock=False)
+        self.worker_rss = Array('Q', workers, lock=False)
+        self.target_steps = Array('Q', max(1, num_targets))
+        self.next_slot = Value('i', 0)
+        self.slot = None
+
+    # Claim a worker slot; called once per worker process
+    def attach(self):
+        with self.next_slot.get_lock():
+            self.slot = self.next_slot.value % self.workers
+            self.next_slot.value += 1
+        self.worker_rss[self.slot] = current_rss()
+
+    # Worker side: steps giant steps of target t done, hits table hits among them
+    def advance(self, t, steps, hits=0):
+        slot = self.slot
+        self.worker_steps[slot] += steps
+        if hits:
+            self.worker_hits[slot] += hits
+        self.worker_rss[slot] = current_rss()
+        with self.target_steps.get_lock():
+            self.target_steps[t] += steps
+
+    # Parent side: count steps finished in an earlier run (replayed from a checkpoint)
+    def mark_done(self, t, steps):
+        with self.target_steps.get_lock():
+            self.target_steps[t] += steps
+
+    def snapshot(self):
+        return {
+            'worker_steps': list(self.worker_steps),
+            'worker_hits': list(self.worker_hits),
+            'worker_rss': list(self.worker_rss),
+            'target_steps': list(self.target_steps),
+        }
+
+
+class Reporter(threading.Thread):
+    """
+    Background thread in the parent that turns the shared counters into
+    rates and ETAs every interval seconds and writes them to the console,
+    a JSON status file and a Prometheus textfile (each optional).
+    """
+
+    def __init__(self, counters, totals, interval=DEFAULT_REPORT_INTERVAL,
+                 status_file=None, prom_file=None, console=True):
+        super().__init__(daemon=True)
+        self.counters = counters
+        self.totals = totals  # target -> giant steps in its interval
+        self.interval = interval
+        self.status_file = status_file
+        self.prom_file = prom_file
+        self.console = console
+        self.start_time = time.time()
+        self._stop_event = threading.Event()
+        self._last = None
+
+    def run(self):
+        self._last = (time.time(), self.counters.snapshot())
+        while not self._stop_event.wait(self.interval):
+            self.report()
+
+    # Stop the thread and emit a final report
+    def stop(self):
+        self._stop_event.set()
+        if self.is_alive():
+            self.join()
+        self.report()
+
+    def status(self):
+        now = time.time()
+        current = self.counters.snapshot()
+        last_time, last = self._last or (self.start_time, None)
+        self._last = (now, current)
+        dt = max(now - last_time, 1e-9)
+
+        def delta(key, i):
+            return current[key][i] - (last[key][i] if last else 0)
+
+        workers = [
+            {
+                'worker': w,
+                'steps': current['worker_steps'][w],
+                'steps_per_sec': delta('worker_steps', w) / dt,
+                'hits': current['worker_hits'][w],
+                'rss_bytes': current['worker_rss'][w],
+            }
+            for w in range(len(current['worker_steps']))
+        ]
+        targets = []
+        for t, total in sorted(self.totals.items()):
+            done = current['target_steps'][t]
+            rate = delta('target_steps', t) / dt
+            remaining = max(0, total - done)
+            targets.append({
+                'target': t,
+                'steps': done,
+                'total': total,
+                'progress': done / total if total else 1.0,
+                'steps_per_sec': rate,
+                'eta_seconds': remaining / rate if rate > 0 else (0.0 if not remaining else None),
+            })
+        return {
+            'time': now,
+            'elapsed_seconds': now - self.start_time,
+            'steps': sum(current['worker_steps']),
+            'steps_per_sec': sum(w['steps_per_sec'] for w in workers),
+            'hits': sum(current['worker_hits']),
+            'done': sum(min(t['steps'], t['total']) for t in targets),
+            'total': sum(self.totals.values()),
+            'rss_bytes': current_rss(),
+            'workers': workers,
+            'targets': targets,
+        }
+
+    def report(self):
+        status = self.status()
+        if self.console:
+            etas = [t['eta_seconds'] for t in status['targets'] if t['eta_seconds'] is not None]
+            eta = f"{max(etas):.0f}s" if etas else "unknown"
+            print(
+                f"[{status['elapsed_seconds']:.0f}s] {status['done']}/{status['total']} giant steps "
+                f"({status['steps_per_sec']:.0f}/s, {len(status['workers'])} workers), hits {status['hits']}, "
+                f"ETA {eta}, RSS {status['rss_bytes'] / 2**20:.0f} MiB",
+                file=sys.stderr, flush=True
+            )
+        try:
+            if self.status_file:
+                write_atomic(self.status_file, json.dumps(status, indent=2) + '\n')
+            if self.prom_file:
+                write_atomic(self.prom_file, prometheus_text(status))
+        except OSError as e:
+            logging.error(f"Error writing telemetry: {e}")
+        return status
+
+
+# Replace a file atomically so readers never see a partial write
+def write_atomic(path, text):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+# Prometheus textfile-collector format
+def prometheus_text(status):
+    lines = []
+
+    def metric(name, kind, help_text, samples):
+        lines.append(f"# HELP {METRIC_PREFIX}_{name} {help_text}")
+        lines.append(f"# TYPE {METRIC_PREFIX}_{name} {kind}")
+        for labels, value in samples:
+            label_text = ','.join(f'{k}="{v}"' for k, v in labels.items())
+            lines.append(f"{METRIC_PREFIX}_{name}{{{label_text}}} {value}" if label_text else f"{METRIC_PREFIX}_{name} {value}")
+
+    workers = status['workers']
+    targets = status['targets']
+    metric('giant_steps_total', 'counter', 'Giant steps done by each worker.',
+           [({'worker': w['worker']}, w['steps']) for w in workers])
+    metric('giant_steps_per_second', 'gauge', 'Giant-step rate of each worker.',
+           [({'worker': w['worker']}, f"{w['steps_per_sec']:.3f}") for w in workers])
+    metric('hits_total', 'counter', 'Keys reported by each worker (table and target-hash hits).',
+           [({'worker': w['worker']}, w['hits']) for w in workers])
+    metric('rss_bytes', 'gauge', 'Resident set size.',
+           [({'process': 'parent'}, status['rss_bytes'])] + [({'process': f"worker{w['worker']}"}, w['rss_bytes']) for w in workers])
+    metric('target_steps', 'gauge', 'Giant steps done per target, including resumed ones.',
+           [({'target': t['target']}, t['steps']) for t in targets])
+    metric('target_steps_total', 'gauge', 'Giant steps in each target interval.',
+           [({'target': t['target']}, t['total']) for t in targets])
+    metric('target_eta_seconds', 'gauge', 'Estimated seconds until each target is done.',
+           [({'target': t['target']}, f"{t['eta_seconds']:.1f}") for t in targets if t['eta_seconds'] is not None])
+    return '\n'.join(lines) + '\n'